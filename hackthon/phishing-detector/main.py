@@ -4,37 +4,49 @@
 import sys
 import os
 import logging
+import logging.config
 
 # Add src to path
 sys.path.insert(0, os.path.dirname(__file__))
 
-from src.app import create_app
+import uvicorn
+from src.config import config
+from src.logging_config import build_log_config, stop_listener
 
-# Setup logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler('phishing_detector.log'),
-        logging.StreamHandler()
-    ]
-)
+LOG_FILE = 'phishing_detector.log'
 
 logger = logging.getLogger(__name__)
 
 def main():
     """Run the application"""
+    # Log through a queue so callers never wait on file or console I/O. Only
+    # here: worker processes that re-import this module (uvicorn's spawned
+    # workers, forkserver extraction workers) must not start their own listener
+    log_config = build_log_config(LOG_FILE)
+    logging.config.dictConfig(log_config)
     logger.info("Starting Phishing Detection System")
     
     try:
-        # Create app
-        app, detector, alert_manager = create_app('development')
+        config_name = os.getenv('APP_CONFIG', 'development')
+        server_config = config.get(config_name, config['development'])
         
-        logger.info("Application created successfully")
-        logger.info("Starting server on http://0.0.0.0:5000")
+        logger.info(f"Starting server on http://{server_config.HOST}:{server_config.PORT} "
+                    f"with {server_config.WORKERS} worker(s)")
         
-        # Run Flask app
-        app.run(host='0.0.0.0', port=5000, debug=True, use_reloader=False)
+        # uvicorn applies log_config again, here and in each worker process;
+        # write out what is queued before that replaces this listener's handlers
+        stop_listener()
+        
+        # Run ASGI app; each worker process loads the model once in the app lifespan
+        uvicorn.run(
+            'src.app:app',
+            host=server_config.HOST,
+            port=server_config.PORT,
+            loop=server_config.EVENT_LOOP,
+            http=server_config.HTTP_PROTOCOL,
+            workers=server_config.WORKERS,
+            log_config=log_config
+        )
         
     except Exception as e:
         logger.error(f"Failed to start application: {e}")
@@ -1,8 +1,14 @@
+import heapq
+import itertools
 import logging
-from datetime import datetime
+import queue
+import threading
+import time
+from collections import Counter, deque
+from datetime import datetime, timedelta
 from typing import Dict, List, Callable
 from enum import Enum
-import json
+import orjson
 
 logger = logging.getLogger(__name__)
 
@@ -16,6 +22,9 @@ class AlertSeverity(Enum):
 class Alert:
     """Represents a phishing detection alert"""
     
+    # No per-instance __dict__; keeps up to max_alerts alerts cheap to hold
+    __slots__ = ('alert_id', 'severity', 'message', 'details', 'timestamp', 'read', 'acknowledged')
+    
     def __init__(
         self,
         alert_id: str,
@@ -50,11 +59,31 @@ class Alert:
 class AlertManager:
     """Manages alerts and notifications"""
     
+    # Handlers are notified from a background thread in batches of up to
+    # NOTIFY_BATCH_SIZE alerts, waiting at most NOTIFY_BATCH_WAIT seconds to fill one
+    NOTIFY_BATCH_SIZE = 50
+    NOTIFY_BATCH_WAIT = 0.1
+    
     def __init__(self):
+        self.max_alerts = 1000
         self.alerts: Dict[str, Alert] = {}
-        self.alert_history: List[Alert] = []
+        # Bounded history: appending past max_alerts drops the oldest alert in O(1)
+        self.alert_history: deque = deque(maxlen=self.max_alerts)
         self.handlers: List[Callable] = []
-        self.max_alerts = 1000
+        self.batch_handlers: List[Callable] = []
+        # Sequence number for alert IDs
+        self._counter = itertools.count()
+        # Active alert counts kept up to date so get_stats never scans self.alerts
+        self._by_severity: Counter = Counter()
+        self._unread = 0
+        
+        # Alerts waiting to be delivered to handlers
+        self._notify_queue: queue.Queue = queue.Queue()
+        # Set by close(); the lock keeps create_alert from queueing behind the stop sentinel
+        self._closed = False
+        self._close_lock = threading.Lock()
+        self._notifier = threading.Thread(target=self._drain, name='alert-notifier', daemon=True)
+        self._notifier.start()
     
     def create_alert(
         self,
@@ -68,15 +97,20 @@ class AlertManager:
             alert_id = self._generate_alert_id()
         
         alert = Alert(alert_id, severity, message, details)
+        if alert_id in self.alerts:
+            self._forget(self.alerts[alert_id])
         self.alerts[alert_id] = alert
+        self._by_severity[severity] += 1
+        self._unread += 1
         self.alert_history.append(alert)
         
-        # Keep history size manageable
-        if len(self.alert_history) > self.max_alerts:
-            self.alert_history = self.alert_history[-self.max_alerts:]
-        
-        # Notify handlers
-        self._notify_handlers(alert)
+        # Notify handlers without blocking the caller, or right here once closed
+        with self._close_lock:
+            queued = not self._closed
+            if queued:
+                self._notify_queue.put(alert)
+        if not queued:
+            self._notify_handlers([alert])
         
         logger.info(f"Alert created: {alert}")
         return alert
@@ -85,19 +119,28 @@ class AlertManager:
         """Get alert by ID"""
         return self.alerts.get(alert_id)
     
-    def get_all_alerts(self, unread_only: bool = False) -> List[Dict]:
-        """Get all alerts"""
-        alerts = list(self.alerts.values())
+    def get_all_alerts(self, unread_only: bool = False, limit: int = None) -> List[Dict]:
+        """Get all alerts, newest first (optionally only the newest `limit`)"""
+        alerts = self.alerts.values()
         
         if unread_only:
             alerts = [a for a in alerts if not a.read]
         
-        return [a.to_dict() for a in sorted(alerts, key=lambda a: a.timestamp, reverse=True)]
+        if limit is not None:
+            # Partial selection instead of sorting every alert
+            newest = heapq.nlargest(limit, alerts, key=lambda a: a.timestamp)
+        else:
+            newest = sorted(alerts, key=lambda a: a.timestamp, reverse=True)
+        
+        return [a.to_dict() for a in newest]
     
     def mark_alert_as_read(self, alert_id: str) -> bool:
         """Mark alert as read"""
         if alert_id in self.alerts:
-            self.alerts[alert_id].read = True
+            alert = self.alerts[alert_id]
+            if not alert.read:
+                alert.read = True
+                self._unread -= 1
             return True
         return False
     
@@ -111,13 +154,12 @@ class AlertManager:
     def delete_alert(self, alert_id: str) -> bool:
         """Delete alert"""
         if alert_id in self.alerts:
-            del self.alerts[alert_id]
+            self._forget(self.alerts.pop(alert_id))
             return True
         return False
     
     def clear_old_alerts(self, days: int = 30):
         """Remove alerts older than specified days"""
-        from datetime import timedelta
         cutoff_date = datetime.utcnow() - timedelta(days=days)
         
         to_delete = []
@@ -126,50 +168,117 @@ class AlertManager:
                 to_delete.append(alert_id)
         
         for alert_id in to_delete:
-            del self.alerts[alert_id]
+            self._forget(self.alerts.pop(alert_id))
         
         logger.info(f"Cleared {len(to_delete)} old alerts")
         return len(to_delete)
     
-    def register_handler(self, handler: Callable):
-        """Register alert handler/listener"""
-        self.handlers.append(handler)
+    def _forget(self, alert: Alert):
+        """Remove an alert that is leaving self.alerts from the running counts"""
+        self._by_severity[alert.severity] -= 1
+        if not alert.read:
+            self._unread -= 1
+    
+    def register_handler(self, handler: Callable, batch: bool = False):
+        """Register alert handler/listener
+        
+        Batch handlers receive a list of alerts; other handlers receive one alert per call.
+        """
+        if batch:
+            self.batch_handlers.append(handler)
+        else:
+            self.handlers.append(handler)
     
     def unregister_handler(self, handler: Callable):
         """Unregister alert handler"""
         if handler in self.handlers:
             self.handlers.remove(handler)
+        if handler in self.batch_handlers:
+            self.batch_handlers.remove(handler)
+    
+    def flush(self):
+        """Block until every queued alert has been delivered to handlers
+        
+        Returns immediately once the notifier thread has stopped.
+        """
+        if self._notifier.is_alive():
+            self._notify_queue.join()
+    
+    def close(self):
+        """Deliver pending alerts and stop the notifier thread
+        
+        Alerts created afterwards are delivered synchronously by create_alert.
+        """
+        with self._close_lock:
+            if not self._closed:
+                self._closed = True
+                self._notify_queue.put(None)
+        self._notifier.join()
+    
+    def _drain(self):
+        """Background loop delivering queued alerts to handlers in batches"""
+        running = True
+        while running:
+            alert = self._notify_queue.get()
+            if alert is None:
+                self._notify_queue.task_done()
+                break
+            
+            batch = [alert]
+            deadline = time.monotonic() + self.NOTIFY_BATCH_WAIT
+            while len(batch) < self.NOTIFY_BATCH_SIZE:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    alert = self._notify_queue.get(timeout=timeout)
+                except queue.Empty:
+                    break
+                if alert is None:
+                    # Stop after delivering what is already batched
+                    self._notify_queue.task_done()
+                    running = False
+                    break
+                batch.append(alert)
+            
+            self._notify_handlers(batch)
+            for _ in batch:
+                self._notify_queue.task_done()
     
-    def _notify_handlers(self, alert: Alert):
+    def _notify_handlers(self, alerts: List[Alert]):
         """Notify all registered handlers"""
-        for handler in self.handlers:
+        for handler in self.batch_handlers:
             try:
-                handler(alert)
+                handler(alerts)
             except Exception as e:
                 logger.error(f"Error in alert handler: {e}")
+        
+        for handler in self.handlers:
+            for alert in alerts:
+                try:
+                    handler(alert)
+                except Exception as e:
+                    logger.error(f"Error in alert handler: {e}")
     
     def _generate_alert_id(self) -> str:
-        """Generate unique alert ID"""
-        import uuid
-        return str(uuid.uuid4())
+        """Generate unique alert ID (millisecond timestamp + sequence number, both hex)"""
+        return f"{int(time.time() * 1000):011x}{next(self._counter):06x}"
     
     def get_stats(self) -> Dict:
         """Get alert statistics"""
+        counts = self._by_severity
         severity_counts = {
-            'critical': 0,
-            'high': 0,
-            'medium': 0,
-            'low': 0
+            'critical': counts[AlertSeverity.CRITICAL],
+            'high': counts[AlertSeverity.HIGH],
+            'medium': counts[AlertSeverity.MEDIUM],
+            'low': counts[AlertSeverity.LOW]
         }
         
-        for alert in self.alerts.values():
-            severity_counts[alert.severity.value] += 1
-        
         return {
             'total_active': len(self.alerts),
             'total_history': len(self.alert_history),
             'by_severity': severity_counts,
-            'unread_count': sum(1 for a in self.alerts.values() if not a.read)
+            'unread_count': self._unread
         }
 
 class EmailAlertFormatter:
@@ -187,7 +296,7 @@ Time: {alert.timestamp}
 Message: {alert.message}
 
 Details:
-{json.dumps(alert.details, indent=2)}
+{orjson.dumps(alert.details, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS).decode()}
 """
 
 class WebSocketAlertHandler:
@@ -208,3 +317,16 @@ class WebSocketAlertHandler:
             logger.info(f"Alert sent via WebSocket: {alert.alert_id}")
         except Exception as e:
             logger.error(f"Error sending alert via WebSocket: {e}")
+    
+    def send_batch(self, alerts: List[Alert]):
+        """Send several alerts via WebSocket in a single emit"""
+        try:
+            self.socketio.emit(
+                'phishing_alerts',
+                [alert.to_dict() for alert in alerts],
+                broadcast=True,
+                namespace='/alerts'
+            )
+            logger.info(f"{len(alerts)} alerts sent via WebSocket")
+        except Exception as e:
+            logger.error(f"Error sending alerts via WebSocket: {e}")
@@ -1,45 +1,157 @@
+import asyncio
 import logging
-from datetime import datetime
-from flask import Blueprint, request, jsonify
+import multiprocessing
+import operator
+import os
+import time
+from bisect import bisect_right
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+import numpy as np
+import orjson
+from fastapi import APIRouter, Depends, FastAPI, Request
+from fastapi.responses import Response, StreamingResponse
+from pydantic import BaseModel
+from src.config import Config
 from src.models.detector import PhishingDetector
 from src.utils.feature_extractor import FeatureExtractor
 from src.utils.email_parser import EmailParser
 
 logger = logging.getLogger(__name__)
 
-# Create blueprint
-api_bp = Blueprint('api', __name__, url_prefix='/api/v1')
+class OrjsonResponse(Response):
+    """JSON response rendered with orjson (also handles numpy scalars and arrays)"""
+    media_type = 'application/json'
+    
+    def render(self, content) -> bytes:
+        return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY)
+
+# Create router
+api_router = APIRouter(prefix='/api/v1', default_response_class=OrjsonResponse)
 
 # Initialize components
-detector = None
 feature_extractor = FeatureExtractor()
 email_parser = EmailParser()
 
-def init_api(app, phishing_detector: PhishingDetector):
-    """Initialize API with detector instance"""
-    global detector
-    detector = phishing_detector
-    app.register_blueprint(api_bp)
+# CPUs available to each uvicorn worker process; both pools below are sized
+# from it, so together the workers use about one thread/process per CPU
+WORKER_CPUS = max(1, (os.cpu_count() or 1) // Config.WORKERS)
+
+# Model inference runs here so the event loop keeps serving requests; both
+# pools are started on first use and stopped by shutdown_executors
+inference_executor = None
+
+# Batch feature extraction is pure-Python regex work, so large chunks are
+# spread over worker processes. This needs WORKER_CPUS >= 2: with the default
+# WORKERS (one per CPU) extraction stays in-process; run fewer workers, e.g.
+# WORKERS=2 on an 8-CPU host for 4 extraction processes per worker.
+extraction_pool = None
+EXTRACTION_WORKERS = WORKER_CPUS
+PARALLEL_EXTRACTION_MIN_ITEMS = 64
+# Forking a process that already runs executor and logging threads can
+# deadlock; start workers from a clean forkserver (spawn where unavailable)
+EXTRACTION_START_METHOD = 'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn'
+
+# Width of the model's numeric feature vector
+FEATURE_COUNT = 16
+
+# Batch items scored per model call while streaming /scan/batch results
+BATCH_CHUNK_SIZE = 256
+
+# Confidence thresholds for 'medium', 'high' and 'critical' risk
+RISK_THRESHOLDS = (0.4, 0.6, 0.8)
+RISK_LEVELS = ('low', 'medium', 'high', 'critical')
+
+# URLs whose flags settle the verdict skip the model and get these confidences
+FAST_PATH_BENIGN_CONFIDENCE = 0.05
+FAST_PATH_PHISHING_CONFIDENCE = 0.95
+FAST_PATH_MAX_BENIGN_URL_LENGTH = 80
+
+# Email features in model vector order
+EMAIL_FEATURE_KEYS = (
+    'subject_length', 'body_length', 'url_count', 'urgent_words',
+    'financial_words', 'personal_words', 'action_words', 'urgency_score',
+    'url_risk_score', 'suspicious_urls', 'sender_domain_mismatch', 'sender_suspicious',
+    'excessive_links', 'short_body', 'many_exclamations', 'unusual_capitals'
+)
+_get_email_features = operator.itemgetter(*EMAIL_FEATURE_KEYS)
+
+# URL features in model vector order (slot 4 is stored inverted: "not HTTPS")
+URL_FEATURE_KEYS = (
+    'url_length', 'subdomain_count', 'has_ip', 'has_suspicious_pattern',
+    'uses_https', 'has_port', 'suspicious_tld'
+)
+_get_url_features = operator.itemgetter(*URL_FEATURE_KEYS)
+
+# (epoch second, ISO string) of the last timestamp handed out; replaced as one tuple
+_timestamp_cache = (0, '')
+
+def _iso_now() -> str:
+    """Current UTC time as an ISO 8601 string, formatted at most once per second"""
+    global _timestamp_cache
+    second = int(time.time())
+    cached_second, cached = _timestamp_cache
+    if second != cached_second:
+        cached = datetime.fromtimestamp(second, timezone.utc).isoformat().replace('+00:00', 'Z')
+        _timestamp_cache = (second, cached)
+    return cached
+
+class EmailScanRequest(BaseModel):
+    """Request body for /scan/email"""
+    email_content: str
 
-@api_bp.route('/health', methods=['GET'])
-def health():
+class URLScanRequest(BaseModel):
+    """Request body for /scan/url"""
+    url: str
+
+class BatchScanRequest(BaseModel):
+    """Request body for /scan/batch"""
+    items: List[Dict[str, Any]]
+
+def init_api(app: FastAPI, phishing_detector: PhishingDetector):
+    """Attach the detector the API routes serve; safe to call again to swap models"""
+    app.state.phishing_detector = phishing_detector
+
+def shutdown_executors():
+    """Stop the inference and extraction pools; they restart on next use"""
+    global inference_executor, extraction_pool
+    if inference_executor is not None:
+        inference_executor.shutdown()
+        inference_executor = None
+    if extraction_pool is not None:
+        extraction_pool.shutdown()
+        extraction_pool = None
+
+def _get_inference_executor() -> ThreadPoolExecutor:
+    """The inference thread pool, started on first use"""
+    global inference_executor
+    if inference_executor is None:
+        inference_executor = ThreadPoolExecutor(
+            max_workers=WORKER_CPUS,
+            thread_name_prefix='inference'
+        )
+    return inference_executor
+
+def get_detector(request: Request) -> PhishingDetector:
+    """Dependency returning the app's detector (None before startup)"""
+    return getattr(request.app.state, 'phishing_detector', None)
+
+@api_router.get('/health')
+def health(detector: PhishingDetector = Depends(get_detector)):
     """Health check endpoint"""
-    return jsonify({
+    return OrjsonResponse({
         'status': 'healthy',
-        'timestamp': datetime.utcnow().isoformat(),
+        'timestamp': _iso_now(),
         'model_loaded': detector is not None and detector.model is not None
-    }), 200
+    })
 
-@api_bp.route('/scan/email', methods=['POST'])
-def scan_email():
+@api_router.post('/scan/email')
+async def scan_email(payload: EmailScanRequest, detector: PhishingDetector = Depends(get_detector)):
     """Scan email for phishing"""
     try:
-        data = request.get_json()
-        
-        if not data or 'email_content' not in data:
-            return jsonify({'error': 'Missing email_content'}), 400
-        
-        email_content = data['email_content']
+        email_content = payload.email_content
         
         # Parse email
         parsed = email_parser.parse_email(email_content)
@@ -48,39 +160,17 @@ def scan_email():
         features = feature_extractor.extract_email_features(email_content)
         
         # Prepare feature vector for model
-        feature_vector = [
-            features['subject_length'],
-            features['body_length'],
-            features['url_count'],
-            features['urgent_words'],
-            features['financial_words'],
-            features['personal_words'],
-            features['action_words'],
-            features['urgency_score'],
-            float(features['url_risk_score']),
-            features['suspicious_urls'],
-            int(features['sender_domain_mismatch']),
-            int(features['sender_suspicious']),
-            int(features['excessive_links']),
-            int(features['short_body']),
-            int(features['many_exclamations']),
-            int(features['unusual_capitals']),
-        ]
-        
-        import numpy as np
-        feature_vector = np.array(feature_vector)
+        feature_vector = np.empty(FEATURE_COUNT, dtype=np.float32)
+        _fill_email_features(feature_vector, features)
         
         # Make prediction
-        prediction, confidence = detector.predict(
-            features['full_text'],
-            feature_vector
-        )
+        prediction, confidence = await _predict(detector, features['full_text'], feature_vector)
         
         is_phishing = prediction == 1
         
-        return jsonify({
+        return OrjsonResponse({
             'is_phishing': is_phishing,
-            'confidence': float(confidence),
+            'confidence': confidence,
             'risk_level': _get_risk_level(confidence),
             'details': {
                 'subject': parsed.get('subject', ''),
@@ -89,52 +179,39 @@ def scan_email():
                 'suspicious_urls': features['suspicious_urls'],
                 'urls': parsed.get('urls', [])
             },
-            'timestamp': datetime.utcnow().isoformat()
-        }), 200
+            'timestamp': _iso_now()
+        })
         
     except Exception as e:
         logger.error(f"Error scanning email: {e}")
-        return jsonify({'error': str(e)}), 500
+        return OrjsonResponse({'error': str(e)}, status_code=500)
 
-@api_bp.route('/scan/url', methods=['POST'])
-def scan_url():
+@api_router.post('/scan/url')
+async def scan_url(payload: URLScanRequest, detector: PhishingDetector = Depends(get_detector)):
     """Scan URL for phishing"""
     try:
-        data = request.get_json()
-        
-        if not data or 'url' not in data:
-            return jsonify({'error': 'Missing url'}), 400
-        
-        url = data['url']
+        url = payload.url
         
         # Extract URL features
         features = feature_extractor.extract_url_features(url)
         
-        # Create feature vector for model prediction
-        feature_vector = [
-            features['url_length'],
-            features['subdomain_count'],
-            int(features['has_ip']),
-            int(features['has_suspicious_pattern']),
-            int(not features['uses_https']),
-            int(features['has_port']),
-            int(features['suspicious_tld']),
-            0,  # Padding to match email features
-            0, 0, 0, 0, 0, 0, 0, 0
-        ]
-        
-        import numpy as np
-        feature_vector = np.array(feature_vector)
-        
-        # Make prediction (using URL as text)
-        prediction, confidence = detector.predict(url, feature_vector)
-        
-        is_phishing = prediction == 1
+        confidence = _fast_path_confidence(features)
+        if confidence is not None:
+            is_phishing = confidence >= 0.5
+        else:
+            # Create feature vector for model prediction
+            feature_vector = np.empty(FEATURE_COUNT, dtype=np.float32)
+            _fill_url_features(feature_vector, features)
+            
+            # Make prediction (using URL as text)
+            prediction, confidence = await _predict(detector, url, feature_vector)
+            
+            is_phishing = prediction == 1
         
-        return jsonify({
+        return OrjsonResponse({
             'url': url,
             'is_phishing': is_phishing,
-            'confidence': float(confidence),
+            'confidence': confidence,
             'risk_level': _get_risk_level(confidence),
             'details': {
                 'domain': features['domain'],
@@ -144,127 +221,204 @@ def scan_url():
                 'suspicious_pattern': features['has_suspicious_pattern'],
                 'suspicious_tld': features['suspicious_tld']
             },
-            'timestamp': datetime.utcnow().isoformat()
-        }), 200
+            'timestamp': _iso_now()
+        })
         
     except Exception as e:
         logger.error(f"Error scanning URL: {e}")
-        return jsonify({'error': str(e)}), 500
+        return OrjsonResponse({'error': str(e)}, status_code=500)
 
-@api_bp.route('/scan/batch', methods=['POST'])
-def scan_batch():
-    """Scan multiple emails/URLs in batch"""
-    try:
-        data = request.get_json()
-        
-        if not data or 'items' not in data:
-            return jsonify({'error': 'Missing items'}), 400
-        
-        items = data['items']
-        results = []
-        
-        for item in items:
-            try:
-                if 'email_content' in item:
-                    # Scan as email
-                    parsed = email_parser.parse_email(item['email_content'])
-                    features = feature_extractor.extract_email_features(item['email_content'])
-                    
-                    feature_vector = [
-                        features['subject_length'],
-                        features['body_length'],
-                        features['url_count'],
-                        features['urgent_words'],
-                        features['financial_words'],
-                        features['personal_words'],
-                        features['action_words'],
-                        features['urgency_score'],
-                        float(features['url_risk_score']),
-                        features['suspicious_urls'],
-                        int(features['sender_domain_mismatch']),
-                        int(features['sender_suspicious']),
-                        int(features['excessive_links']),
-                        int(features['short_body']),
-                        int(features['many_exclamations']),
-                        int(features['unusual_capitals']),
-                    ]
-                    
-                    import numpy as np
-                    feature_vector = np.array(feature_vector)
-                    
-                    prediction, confidence = detector.predict(
-                        features['full_text'],
-                        feature_vector
-                    )
-                    
-                    results.append({
-                        'type': 'email',
-                        'is_phishing': prediction == 1,
-                        'confidence': float(confidence),
-                        'risk_level': _get_risk_level(confidence)
-                    })
-                    
-                elif 'url' in item:
-                    # Scan as URL
-                    features = feature_extractor.extract_url_features(item['url'])
-                    
-                    feature_vector = [
-                        features['url_length'],
-                        features['subdomain_count'],
-                        int(features['has_ip']),
-                        int(features['has_suspicious_pattern']),
-                        int(not features['uses_https']),
-                        int(features['has_port']),
-                        int(features['suspicious_tld']),
-                        0, 0, 0, 0, 0, 0, 0, 0, 0
-                    ]
-                    
-                    import numpy as np
-                    feature_vector = np.array(feature_vector)
-                    
-                    prediction, confidence = detector.predict(item['url'], feature_vector)
-                    
-                    results.append({
-                        'type': 'url',
-                        'url': item['url'],
-                        'is_phishing': prediction == 1,
-                        'confidence': float(confidence),
-                        'risk_level': _get_risk_level(confidence)
-                    })
-            except Exception as e:
-                logger.warning(f"Error processing item: {e}")
-                results.append({'error': str(e)})
-        
-        return jsonify({
-            'total': len(items),
-            'results': results,
-            'timestamp': datetime.utcnow().isoformat()
-        }), 200
+@api_router.post('/scan/batch')
+async def scan_batch(payload: BatchScanRequest, detector: PhishingDetector = Depends(get_detector)):
+    """Scan multiple emails/URLs in batch
+    
+    Results are streamed as each chunk of items is scored, so the response
+    starts right away and never holds every result in memory.
+    """
+    return StreamingResponse(_stream_batch(detector, payload.items), media_type='application/json')
+
+async def _stream_batch(detector: PhishingDetector, items: List[Dict[str, Any]]):
+    """Yield the batch response body: {"total": ..., "results": [...], "timestamp": ...}"""
+    yield b'{"total":%d,"results":[' % len(items)
+    
+    separator = b''
+    for start in range(0, len(items), BATCH_CHUNK_SIZE):
+        chunk = items[start:start + BATCH_CHUNK_SIZE]
+        try:
+            results = await _scan_chunk(detector, chunk)
+        except Exception as e:
+            logger.error(f"Error in batch scan: {e}")
+            results = [{'error': str(e)} for _ in chunk]
         
-    except Exception as e:
-        logger.error(f"Error in batch scan: {e}")
-        return jsonify({'error': str(e)}), 500
+        if results:
+            yield separator + b','.join(
+                orjson.dumps(result, option=orjson.OPT_SERIALIZE_NUMPY) for result in results
+            )
+            separator = b','
+    
+    yield b'],"timestamp":' + orjson.dumps(_iso_now()) + b'}'
+
+async def _scan_chunk(detector: PhishingDetector, items: List[Dict[str, Any]]) -> List[Dict]:
+    """Score one chunk of batch items with one model call per item type"""
+    results = []
+    email_batch = []  # (result index, features)
+    url_batch = []  # (result index, url, features)
+    
+    for item, (kind, features) in zip(items, await _extract_batch(items)):
+        if kind == 'email':
+            email_batch.append((len(results), features))
+            results.append({'type': 'email'})
+        elif kind == 'url':
+            result = {'type': 'url', 'url': item['url']}
+            confidence = _fast_path_confidence(features)
+            if confidence is not None:
+                result.update({
+                    'is_phishing': confidence >= 0.5,
+                    'confidence': confidence,
+                    'risk_level': _get_risk_level(confidence)
+                })
+            else:
+                url_batch.append((len(results), item['url'], features))
+            results.append(result)
+        elif kind == 'error':
+            results.append({'error': features})
+        else:
+            # One result per item keeps results aligned with the input and 'total'
+            results.append({'error': 'Missing email_content or url'})
+    
+    # One feature matrix and one model call per item type
+    batches = []
+    
+    if email_batch:
+        X_email = np.empty((len(email_batch), FEATURE_COUNT), dtype=np.float32)
+        for row, (_, features) in enumerate(email_batch):
+            _fill_email_features(X_email[row], features)
+        texts = [features['full_text'] for _, features in email_batch]
+        batches.append(([index for index, _ in email_batch], texts, X_email))
+    
+    if url_batch:
+        X_url = np.empty((len(url_batch), FEATURE_COUNT), dtype=np.float32)
+        for row, (_, _, features) in enumerate(url_batch):
+            _fill_url_features(X_url[row], features)
+        texts = [url for _, url, _ in url_batch]
+        batches.append(([index for index, _, _ in url_batch], texts, X_url))
+    
+    outcomes = await asyncio.gather(*(
+        _predict_batch(detector, texts, X) for _, texts, X in batches
+    ), return_exceptions=True)
+    
+    for (indices, _, _), outcome in zip(batches, outcomes):
+        if isinstance(outcome, Exception):
+            # Only this model call's items fail; fast-path URLs and the other
+            # item type keep their results
+            logger.error(f"Error in batch scan: {outcome}")
+            for index in indices:
+                results[index] = {'error': str(outcome)}
+            continue
+        predictions, confidences = outcome
+        for index, prediction, confidence in zip(indices, predictions, confidences):
+            results[index].update({
+                'is_phishing': prediction == 1,
+                'confidence': confidence,
+                'risk_level': _get_risk_level(confidence)
+            })
+    
+    return results
+
+async def _extract_batch(items: List[Dict[str, Any]]) -> list:
+    """Extract features for batch items, in worker processes when the chunk is large"""
+    global extraction_pool
+    if len(items) < PARALLEL_EXTRACTION_MIN_ITEMS or EXTRACTION_WORKERS < 2:
+        return _extract_items(items)
+    
+    if extraction_pool is None:
+        extraction_pool = ProcessPoolExecutor(
+            max_workers=EXTRACTION_WORKERS,
+            mp_context=multiprocessing.get_context(EXTRACTION_START_METHOD)
+        )
+    pool = extraction_pool
+    
+    # One slice per worker keeps pickling overhead to a few round trips
+    size = -(-len(items) // EXTRACTION_WORKERS)
+    loop = asyncio.get_running_loop()
+    try:
+        parts = await asyncio.gather(*(
+            loop.run_in_executor(pool, _extract_items, items[start:start + size])
+            for start in range(0, len(items), size)
+        ))
+    except BrokenProcessPool:
+        # A worker died and a broken pool never recovers: drop it (unless a
+        # concurrent batch already replaced it) and extract this batch here
+        logger.warning("Extraction pool broken, extracting batch in-process; pool restarts on next use")
+        if extraction_pool is pool:
+            extraction_pool = None
+        pool.shutdown(wait=False, cancel_futures=True)
+        return _extract_items(items)
+    return [extracted for part in parts for extracted in part]
+
+def _extract_items(items: List[Dict[str, Any]]) -> list:
+    """Extract features for each item as ('email' | 'url', features), ('error', message) or (None, None)"""
+    extracted = []
+    for item in items:
+        try:
+            if 'email_content' in item:
+                # Scan as email
+                extracted.append(('email', feature_extractor.extract_email_features(item['email_content'])))
+            elif 'url' in item:
+                # Scan as URL
+                extracted.append(('url', feature_extractor.extract_url_features(item['url'])))
+            else:
+                extracted.append((None, None))
+        except Exception as e:
+            logger.warning(f"Error processing item: {e}")
+            extracted.append(('error', str(e)))
+    return extracted
 
-@api_bp.route('/model/info', methods=['GET'])
-def model_info():
+@api_router.get('/model/info')
+def model_info(detector: PhishingDetector = Depends(get_detector)):
     """Get model information"""
     try:
-        return jsonify({
+        return OrjsonResponse({
             'model_loaded': detector is not None and detector.model is not None,
             'vectorizer_loaded': detector is not None and detector.vectorizer is not None,
-            'timestamp': datetime.utcnow().isoformat()
-        }), 200
+            'timestamp': _iso_now()
+        })
     except Exception as e:
         logger.error(f"Error getting model info: {e}")
-        return jsonify({'error': str(e)}), 500
+        return OrjsonResponse({'error': str(e)}, status_code=500)
+
+async def _predict(detector: PhishingDetector, text: str, feature_vector):
+    """Run detector.predict (which caches repeated inputs) in the inference pool"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_get_inference_executor(), detector.predict, text, feature_vector)
+
+async def _predict_batch(detector: PhishingDetector, texts: list, feature_matrix):
+    """Run detector.predict_batch in the inference pool without blocking the event loop"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_get_inference_executor(), detector.predict_batch, texts, feature_matrix)
+
+def _fill_email_features(out: np.ndarray, features: dict):
+    """Write email features into a 16-wide model feature vector in place"""
+    out[:] = _get_email_features(features)
+
+def _fill_url_features(out: np.ndarray, features: dict):
+    """Write URL features into a 16-wide model feature vector in place"""
+    out[:7] = _get_url_features(features)
+    out[4] = 1 - out[4]
+    out[7:] = 0  # Padding to match email features
+
+def _fast_path_confidence(features: dict) -> Optional[float]:
+    """Confidence for URLs the rules can decide without the model, otherwise None"""
+    # A failed URL analysis leaves no domain; let the model handle those
+    if (features['domain'] and features['uses_https'] and not features['has_ip'] and not features['has_port']
+            and not features['has_suspicious_pattern'] and not features['suspicious_tld']
+            and features['url_length'] < FAST_PATH_MAX_BENIGN_URL_LENGTH):
+        return FAST_PATH_BENIGN_CONFIDENCE
+    if (features['has_ip'] and not features['uses_https']
+            and (features['suspicious_tld'] or features['has_suspicious_pattern'])):
+        return FAST_PATH_PHISHING_CONFIDENCE
+    return None
 
 def _get_risk_level(confidence: float) -> str:
     """Determine risk level based on confidence"""
-    if confidence >= 0.8:
-        return 'critical'
-    elif confidence >= 0.6:
-        return 'high'
-    elif confidence >= 0.4:
-        return 'medium'
-    else:
-        return 'low'
+    return RISK_LEVELS[bisect_right(RISK_THRESHOLDS, confidence)]
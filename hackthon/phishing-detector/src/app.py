@@ -1,10 +1,14 @@
+import hashlib
 import logging
 import os
-from flask import Flask, jsonify
-from flask_cors import CORS
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Request
+from fastapi.exceptions import RequestValidationError
+from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import Response
 from src.config import config
 from src.models.detector import PhishingDetector
-from src.api.routes import init_api
+from src.api.routes import OrjsonResponse, api_router, init_api, shutdown_executors
 from src.alerts.alert_manager import AlertManager
 
 # Logging setup
@@ -14,50 +18,94 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-def create_app(config_name: str = 'development'):
-    """Factory function to create Flask app"""
-    
-    # Create Flask app
-    app = Flask(__name__, static_folder='frontend', static_url_path='')
+def create_app(config_name: str = 'development') -> FastAPI:
+    """Factory function to create FastAPI app"""
     
     # Load configuration
     env_config = config.get(config_name, config['development'])
-    app.config.from_object(env_config)
     
-    # Enable CORS
-    CORS(app, resources={r"/api/*": {"origins": "*"}})
+    @asynccontextmanager
+    async def lifespan(app: FastAPI):
+        # Initialize components once per worker process
+        phishing_detector = PhishingDetector(env_config.MODEL_PATH, env_config.VECTORIZER_PATH)
+        if phishing_detector.model is None or phishing_detector.vectorizer is None:
+            logger.warning(f"No trained model loaded from {env_config.MODEL_PATH}; "
+                           f"predictions fall back to 0.5 until train_model.py has been run")
+        alert_manager = AlertManager()
+        
+        # Hand the detector to the API routes and store components in app state
+        init_api(app, phishing_detector)
+        app.state.alert_manager = alert_manager
+        
+        yield
+        
+        # Deliver any queued alert notifications before the worker exits
+        alert_manager.close()
+        # Let in-flight scans finish and stop the worker pools
+        shutdown_executors()
+    
+    # Create FastAPI app
+    app = FastAPI(
+        title='Phishing Detection System',
+        version='1.0.0',
+        debug=env_config.DEBUG,
+        default_response_class=OrjsonResponse,
+        lifespan=lifespan
+    )
+    app.state.config = env_config
     
-    # Initialize components
-    phishing_detector = PhishingDetector()
-    alert_manager = AlertManager()
+    # Enable CORS
+    app.add_middleware(
+        CORSMiddleware,
+        allow_origins=['*'],
+        allow_methods=['*'],
+        allow_headers=['*']
+    )
     
     # Register API routes
-    init_api(app, phishing_detector)
+    app.include_router(api_router)
+    
+    # Keep the {'error': ...} / 400 contract the frontend and extension expect
+    @app.exception_handler(RequestValidationError)
+    async def validation_error(request: Request, exc: RequestValidationError):
+        error = exc.errors()[0]
+        field = error['loc'][-1]
+        if error['type'] == 'missing':
+            message = f'Missing {field}'
+        else:
+            message = f"Invalid request: {error['msg']}"
+        return OrjsonResponse({'error': message}, status_code=400)
     
-    # Store in app context
-    app.phishing_detector = phishing_detector
-    app.alert_manager = alert_manager
+    # Read the frontend once; every request is served from memory
+    frontend_path = os.path.join(os.path.dirname(__file__), '..', 'frontend', 'index.html')
+    with open(frontend_path, 'rb') as f:
+        index_html = f.read()
+    index_etag = f'"{hashlib.blake2b(index_html, digest_size=8).hexdigest()}"'
+    index_headers = {'ETag': index_etag, 'Cache-Control': 'public, max-age=300'}
     
     # Serve frontend
-    @app.route('/')
-    def index():
-        frontend_path = os.path.join(os.path.dirname(__file__), '..', 'frontend', 'index.html')
-        with open(frontend_path, 'r', encoding='utf-8') as f:
-            return f.read()
+    @app.get('/', response_class=Response)
+    def index(request: Request):
+        if request.headers.get('if-none-match') == index_etag:
+            return Response(status_code=304, headers=index_headers)
+        return Response(index_html, media_type='text/html', headers=index_headers)
     
     # Basic health check route
-    @app.route('/status')
+    @app.get('/status')
     def status():
-        return jsonify({
+        return {
             'status': 'running',
             'component': 'Phishing Detection System',
             'version': '1.0.0'
-        })
+        }
     
     logger.info(f"App created with config: {config_name}")
     
-    return app, phishing_detector, alert_manager
+    return app
+
+# ASGI entry point used by uvicorn ("src.app:app")
+app = create_app(os.getenv('APP_CONFIG', 'development'))
 
 if __name__ == '__main__':
-    app, detector, alerts = create_app('development')
-    app.run(host='0.0.0.0', port=5000, debug=True)
+    import uvicorn
+    uvicorn.run(app, host=app.state.config.HOST, port=app.state.config.PORT)
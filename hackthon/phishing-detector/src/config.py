@@ -6,9 +6,17 @@ class Config:
     DEBUG = False
     TESTING = False
     
-    # Flask settings
+    # App settings
     SECRET_KEY = os.getenv('SECRET_KEY', 'dev-key-change-in-production')
     
+    # Server settings (uvicorn)
+    HOST = os.getenv('HOST', '0.0.0.0')
+    PORT = int(os.getenv('PORT', 5000))
+    WORKERS = int(os.getenv('WORKERS', os.cpu_count() or 1))
+    # 'auto' picks uvloop/httptools when installed, asyncio/h11 otherwise (e.g. Windows)
+    EVENT_LOOP = os.getenv('EVENT_LOOP', 'auto')
+    HTTP_PROTOCOL = os.getenv('HTTP_PROTOCOL', 'auto')
+    
     # Database
     SQLALCHEMY_DATABASE_URI = os.getenv('DATABASE_URL', 'sqlite:///phishing_detector.db')
     SQLALCHEMY_TRACK_MODIFICATIONS = False
@@ -21,9 +29,9 @@ class Config:
     ALERT_RETENTION_DAYS = 30
     MAX_ALERTS_PER_USER = 1000
     
-    # Model settings
-    MODEL_PATH = os.path.join(os.path.dirname(__file__), '..', 'models', 'phishing_detector.pkl')
-    VECTORIZER_PATH = os.path.join(os.path.dirname(__file__), '..', 'models', 'vectorizer.pkl')
+    # Model settings (where train_model.py / train_advanced.py save them)
+    MODEL_PATH = os.path.join(os.path.dirname(__file__), 'models', 'phishing_detector.pkl')
+    VECTORIZER_PATH = os.path.join(os.path.dirname(__file__), 'models', 'vectorizer.pkl')
     
     # Processing settings
     MAX_URL_LENGTH = 2048
@@ -0,0 +1,97 @@
+import atexit
+import logging
+import logging.handlers
+import multiprocessing.util
+import queue
+
+LOG_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+
+# Listener started by the latest queue_handler() call in this process
+_listener = None
+
+class _BatchingFileHandler(logging.handlers.MemoryHandler):
+    """Buffers records for the file while the listener has more queued behind them
+    
+    A burst is written out in one go as soon as the queue runs dry, so nothing
+    waits in memory for a later record, a full buffer or an orderly exit (uvicorn
+    workers stopped by SIGTERM never get one).
+    """
+    
+    def __init__(self, log_queue: queue.Queue, capacity: int, flushLevel: int, target: logging.Handler):
+        super().__init__(capacity, flushLevel=flushLevel, target=target)
+        self.log_queue = log_queue
+    
+    def shouldFlush(self, record: logging.LogRecord) -> bool:
+        return super().shouldFlush(record) or self.log_queue.empty()
+
+def queue_handler(log_file: str) -> logging.handlers.QueueHandler:
+    """Handler that only enqueues records; a listener thread writes them to the console and log_file
+    
+    Referenced as a handler factory by build_log_config, so the handlers are
+    created by the same dictConfig call that installs them instead of being
+    closed by it.
+    """
+    global _listener
+    formatter = logging.Formatter(LOG_FORMAT)
+    
+    log_queue = queue.Queue(-1)
+    
+    file_handler = logging.FileHandler(log_file)
+    file_handler.setFormatter(formatter)
+    # Batch file writes; errors are written out immediately
+    buffered_file_handler = _BatchingFileHandler(
+        log_queue,
+        capacity=1024,
+        flushLevel=logging.ERROR,
+        target=file_handler
+    )
+    
+    stream_handler = logging.StreamHandler()
+    stream_handler.setFormatter(formatter)
+    
+    _listener = logging.handlers.QueueListener(log_queue, buffered_file_handler, stream_handler)
+    _listener.start()
+    # multiprocessing children (uvicorn workers) leave through os._exit, which
+    # skips atexit but still runs these finalizers
+    multiprocessing.util.Finalize(None, stop_listener, exitpriority=0)
+    return logging.handlers.QueueHandler(log_queue)
+
+def stop_listener():
+    """Write out everything queued and buffered so far and stop the listener thread
+    
+    Called before another dictConfig replaces the handlers, and at exit.
+    """
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        for handler in _listener.handlers:
+            target = getattr(handler, 'target', None)
+            # MemoryHandler.close writes its buffer to the file first
+            handler.close()
+            if target is not None:
+                target.close()
+        _listener = None
+
+# Drain the queue on exit; logging.shutdown (registered earlier, so run later)
+# then flushes the memory buffer to the file
+atexit.register(stop_listener)
+
+def build_log_config(log_file: str) -> dict:
+    """logging.config.dictConfig / uvicorn log_config routing every logger through queue_handler"""
+    return {
+        'version': 1,
+        'disable_existing_loggers': False,
+        'handlers': {
+            'queue': {
+                '()': 'src.logging_config.queue_handler',
+                'log_file': log_file,
+            },
+        },
+        # uvicorn's own loggers propagate here instead of using their defaults
+        'loggers': {
+            'uvicorn': {'level': 'INFO', 'handlers': [], 'propagate': True},
+            'uvicorn.error': {'level': 'INFO', 'handlers': [], 'propagate': True},
+            'uvicorn.access': {'level': 'INFO', 'handlers': [], 'propagate': True},
+        },
+        'root': {'level': 'INFO', 'handlers': ['queue']},
+    }
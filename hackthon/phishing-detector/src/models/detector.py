@@ -1,7 +1,12 @@
+import hashlib
+import threading
+from collections import OrderedDict
 import numpy as np
 import pandas as pd
+import scipy.sparse as sp
+from sklearn import config_context
 from sklearn.ensemble import RandomForestClassifier, GradientBoostingClassifier
-from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.feature_extraction.text import HashingVectorizer, TfidfTransformer
 from sklearn.pipeline import Pipeline
 from sklearn.preprocessing import StandardScaler
 import joblib
@@ -20,13 +25,64 @@ except ImportError:
     HAS_XGBOOST = False
     logger.warning("XGBoost not available, using GradientBoosting")
 
+# Run XGBoost on the GPU when CuPy is installed and sees a CUDA device
+try:
+    import cupy
+    HAS_GPU = cupy.cuda.runtime.getDeviceCount() > 0
+except Exception:
+    HAS_GPU = False
+XGB_DEVICE = 'cuda' if HAS_GPU else 'cpu'
+
+class PredictionCache:
+    """Thread-safe LRU cache of (prediction, confidence) keyed by input digest"""
+    
+    def __init__(self, maxsize: int = 10000):
+        self.maxsize = maxsize
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+    
+    @staticmethod
+    def make_key(text: str, feature_vector) -> tuple:
+        """Build a compact key; the text is hashed so the cache never holds full email bodies"""
+        digest = hashlib.blake2b(text.encode('utf-8', 'surrogatepass'), digest_size=16).digest()
+        return digest, feature_vector.dtype.str, feature_vector.tobytes()
+    
+    def get(self, key: tuple):
+        """Return the cached result or None"""
+        with self._lock:
+            result = self._entries.get(key)
+            if result is not None:
+                self._entries.move_to_end(key)
+            return result
+    
+    def put(self, key: tuple, result: tuple):
+        """Store a result, evicting the least recently used entry when full"""
+        with self._lock:
+            self._entries[key] = result
+            self._entries.move_to_end(key)
+            if len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+    
+    def clear(self):
+        """Drop all cached results"""
+        with self._lock:
+            self._entries.clear()
+
 class PhishingDetector:
     """ML-based phishing detection model with XGBoost or Gradient Boosting"""
     
     def __init__(self, model_path: str = None, vectorizer_path: str = None):
         self.model = None
         self.vectorizer = None
-        self.scaler = StandardScaler()
+        # No centering, so the sparse TF-IDF matrix stays sparse when scaled;
+        # scaling works in place on the freshly built combined matrix
+        self.scaler = StandardScaler(with_mean=False, copy=False)
+        # Per-column 1/scale_ of the fitted scaler, see _scale
+        self._inv_scale = None
+        # Booster of a fitted XGBoost model, see _model_predict_proba
+        self._booster = None
+        # Results of predict for repeated inputs; cleared whenever the model changes
+        self._prediction_cache = PredictionCache(maxsize=10000)
         self.feature_importance = {}
         self.use_xgboost = HAS_XGBOOST
         
@@ -35,20 +91,27 @@ class PhishingDetector:
         if vectorizer_path and os.path.exists(vectorizer_path):
             self.load_vectorizer(vectorizer_path)
     
-    def create_model(self):
-        """Create a new phishing detection model"""
+    def create_model(self, n_jobs: int = None):
+        """Create a new phishing detection model
+        
+        n_jobs sets the XGBoost thread count (default: one per CPU).
+        """
         if self.use_xgboost:
             try:
+                n_jobs = n_jobs or os.cpu_count()
+                # Histogram split finding ('hist' also runs on CUDA via device)
                 self.model = xgb.XGBClassifier(
                     n_estimators=100,
                     learning_rate=0.1,
                     max_depth=5,
                     random_state=42,
                     tree_method='hist',
-                    device='cpu',
+                    max_bin=256,
+                    n_jobs=n_jobs,
+                    device=XGB_DEVICE,
                     eval_metric='logloss'
                 )
-                logger.info("Using XGBoost model")
+                logger.info(f"Using XGBoost model on {XGB_DEVICE} (hist, nthread={n_jobs})")
             except Exception as e:
                 logger.warning(f"XGBoost initialization failed: {e}, using GradientBoosting")
                 self.use_xgboost = False
@@ -68,15 +131,24 @@ class PhishingDetector:
                 verbose=0
             )
             logger.info("Using GradientBoosting model")
+        self._prediction_cache.clear()
         
-        self.vectorizer = TfidfVectorizer(
-            max_features=1000,
-            min_df=2,
-            max_df=0.95,
-            ngram_range=(1, 2),
-            lowercase=True,
-            stop_words='english'
-        )
+        # TF-IDF over hashed terms: no vocabulary to build or store, and a fixed
+        # width of 1024 columns regardless of the corpus
+        self.vectorizer = Pipeline([
+            ('hash', HashingVectorizer(
+                n_features=1024,
+                ngram_range=(1, 2),
+                lowercase=True,
+                stop_words='english',
+                alternate_sign=False,
+                norm=None,
+                dtype=np.float32
+            )),
+            # Rows are left unnormalized: the StandardScaler that follows rescales
+            # every column anyway, so an L2 pass per row would be wasted work
+            ('tfidf', TfidfTransformer(norm=None, sublinear_tf=True))
+        ])
         
         return self.model, self.vectorizer
     
@@ -84,19 +156,32 @@ class PhishingDetector:
         """Train the model on labeled data"""
         try:
             logger.info("Starting model training...")
+            # Cached results belong to the model being replaced
+            self._prediction_cache.clear()
             
-            # Vectorize text features
+            # Vectorize text features (sparse CSR)
             X_text_vectorized = self.vectorizer.fit_transform(X_text)
-            X_text_vectorized = X_text_vectorized.toarray()
             
             # Combine with other features
-            X_combined = np.hstack([X_text_vectorized, X_features])
+            X_combined = sp.hstack([X_text_vectorized, sp.csr_matrix(X_features.astype(np.float32, copy=False))], format='csr')
             
             # Scale features
-            X_scaled = self.scaler.fit_transform(X_combined)
+            self.scaler.fit(X_combined)
+            self._inv_scale = None
+            X_scaled = self._scale(X_combined)
             
             # Train model
-            self.model.fit(X_scaled, y)
+            if self._on_gpu():
+                try:
+                    # XGBoost uploads the CSR matrix to the device itself
+                    self.model.fit(X_scaled, y)
+                except xgb.core.XGBoostError as e:
+                    logger.warning(f"GPU training failed: {e}, falling back to CPU")
+                    self.model.set_params(device='cpu')
+                    self.model.fit(X_scaled, y)
+            else:
+                self.model.fit(X_scaled, y)
+            self._booster = None
             
             logger.info("Model training completed successfully")
             return True
@@ -105,67 +190,172 @@ class PhishingDetector:
             return False
     
     def predict(self, X_text: str, X_features: np.ndarray) -> Tuple[int, float]:
-        """Predict if email/URL is phishing"""
+        """Predict if email/URL is phishing (memoized on the text digest and feature bytes)
+        
+        Only results of a successful model call are cached; the (0, 0.5)
+        fallback for a missing or failing model is recomputed every time.
+        """
+        key = PredictionCache.make_key(X_text, X_features)
+        result = self._prediction_cache.get(key)
+        if result is not None:
+            return result
+        
+        if self.model is None or self.vectorizer is None:
+            logger.warning("Model not trained or loaded")
+            return 0, 0.5
+        try:
+            predictions, confidences = self._predict_texts([X_text], X_features.reshape(1, -1))
+        except Exception as e:
+            logger.error(f"Error making prediction: {e}")
+            return 0, 0.5
+        
+        result = int(predictions[0]), confidences[0]
+        self._prediction_cache.put(key, result)
+        return result
+    
+    def predict_batch(self, X_text: list, X_features: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Predict many emails/URLs with a single vectorizer and model pass"""
+        n_samples = len(X_text)
         try:
             if self.model is None or self.vectorizer is None:
                 logger.warning("Model not trained or loaded")
-                return 0, 0.5
-            
-            # Vectorize text
-            X_text_vectorized = self.vectorizer.transform([X_text])
-            X_text_vectorized = X_text_vectorized.toarray()
-            
-            # Combine with features
-            X_combined = np.hstack([X_text_vectorized, X_features.reshape(1, -1)])
-            
-            # Scale
-            X_scaled = self.scaler.transform(X_combined)
-            
-            # Predict
-            prediction = self.model.predict(X_scaled)[0]
-            probability = self.model.predict_proba(X_scaled)[0]
+                return np.zeros(n_samples, dtype=int), np.full(n_samples, 0.5)
             
-            # Phishing confidence (probability of class 1)
-            phishing_confidence = probability[1]
-            
-            return int(prediction), phishing_confidence
+            return self._predict_texts(X_text, X_features)
         except Exception as e:
             logger.error(f"Error making prediction: {e}")
-            return 0, 0.5
+            return np.zeros(n_samples, dtype=int), np.full(n_samples, 0.5)
     
-    def predict_proba(self, X_text: str, X_features: np.ndarray) -> Dict[str, float]:
-        """Get probability distribution"""
+    def predict_vectorized(self, X_text_vectorized: sp.csr_matrix, X_features: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """predict_batch for texts already transformed by self.vectorizer"""
+        n_samples = X_text_vectorized.shape[0]
         try:
             if self.model is None:
-                return {'legitimate': 0.5, 'phishing': 0.5}
-            
-            X_text_vectorized = self.vectorizer.transform([X_text])
-            X_text_vectorized = X_text_vectorized.toarray()
-            X_combined = np.hstack([X_text_vectorized, X_features.reshape(1, -1)])
-            X_scaled = self.scaler.transform(X_combined)
-            
-            proba = self.model.predict_proba(X_scaled)[0]
+                logger.warning("Model not trained or loaded")
+                return np.zeros(n_samples, dtype=int), np.full(n_samples, 0.5)
             
-            return {
-                'legitimate': float(proba[0]),
-                'phishing': float(proba[1])
-            }
+            return self._predict_rows(X_text_vectorized, X_features)
         except Exception as e:
-            logger.error(f"Error getting probabilities: {e}")
-            return {'legitimate': 0.5, 'phishing': 0.5}
+            logger.error(f"Error making prediction: {e}")
+            return np.zeros(n_samples, dtype=int), np.full(n_samples, 0.5)
+    
+    def _predict_texts(self, X_text: list, X_features: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Vectorize and predict raw texts; raises instead of falling back"""
+        # Inputs come from our own feature pipeline; skip the NaN/Inf scans
+        with config_context(assume_finite=True):
+            # Vectorize all texts at once
+            X_text_vectorized = self.vectorizer.transform(X_text)
+        
+        return self._predict_rows(X_text_vectorized, X_features)
+    
+    def _predict_rows(self, X_text_vectorized: sp.csr_matrix, X_features: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Predicted classes and phishing confidences; raises instead of falling back"""
+        with config_context(assume_finite=True):
+            X_scaled = self._combine(X_text_vectorized, X_features)
+            
+            # Predict; the class is the most probable one, so one model pass gives both
+            probabilities = self._model_predict_proba(X_scaled)
+            predictions = self.model.classes_.take(probabilities.argmax(axis=1))
+        
+        # Phishing confidence (probability of class 1)
+        return predictions.astype(int), probabilities[:, 1]
+    
+    def predict_proba(self, X_text: str, X_features: np.ndarray) -> Dict[str, float]:
+        """Get probability distribution"""
+        _, confidences = self.predict_batch([X_text], X_features.reshape(1, -1))
+        phishing = float(confidences[0])
+        return {
+            'legitimate': 1.0 - phishing,
+            'phishing': phishing
+        }
+    
+    def _combine(self, X_text_vectorized: sp.csr_matrix, X_features: np.ndarray) -> sp.csr_matrix:
+        """Stack TF-IDF and numeric features (one row per sample) and scale them"""
+        X_combined = sp.hstack([X_text_vectorized, sp.csr_matrix(X_features.astype(np.float32, copy=False))], format='csr')
+        # hstack built new arrays, so scaling in place leaves X_text_vectorized untouched
+        return self._scale(X_combined)
+    
+    def _scale(self, X: sp.csr_matrix) -> sp.csr_matrix:
+        """Apply the fitted scaler in place to a freshly built CSR matrix
+        
+        Multiplies only the stored values by their column's 1/scale_, the same
+        result as scaler.transform without its checks and intermediate copies.
+        """
+        if self._inv_scale is None:
+            self._inv_scale = (1.0 / self.scaler.scale_).astype(np.float32)
+        X.data *= self._inv_scale[X.indices]
+        return X
+    
+    def _on_gpu(self) -> bool:
+        """Whether the XGBoost model is set to run on a CUDA device"""
+        return HAS_GPU and self.use_xgboost and getattr(self.model, 'device', None) == 'cuda'
+    
+    def _model_predict_proba(self, X_scaled: sp.csr_matrix) -> np.ndarray:
+        """model.predict_proba with results on the host"""
+        if HAS_XGBOOST and isinstance(self.model, xgb.XGBClassifier):
+            # Predict straight from the CSR matrix with the cached booster,
+            # bypassing the sklearn wrapper and DMatrix construction
+            if self._booster is None:
+                self._booster = self.model.get_booster()
+            proba = self._booster.inplace_predict(X_scaled)
+            if self._on_gpu():
+                proba = cupy.asnumpy(cupy.asarray(proba))
+            if proba.ndim == 1:
+                # Binary objective: the booster returns P(class 1) only
+                proba = np.column_stack((1 - proba, proba))
+            return proba
+        return self.model.predict_proba(X_scaled)
     
     def save_model(self, model_path: str):
-        """Save trained model"""
+        """Save trained model together with the fitted scaler and vectorizer
+        
+        XGBoost models are written next to model_path in XGBoost's native
+        binary format (.ubj), which loads much faster than a pickled model.
+        The bundle then records only that file's name, so the .pkl and .ubj
+        must be kept (committed, copied, deployed) together.
+        """
         try:
-            joblib.dump(self.model, model_path)
+            bundle = {
+                'model': self.model,
+                'scaler': self.scaler,
+                'vectorizer': self.vectorizer
+            }
+            if HAS_XGBOOST and isinstance(self.model, xgb.XGBClassifier):
+                booster_path = os.path.splitext(model_path)[0] + '.ubj'
+                self.model.save_model(booster_path)
+                bundle['model'] = None
+                bundle['booster_file'] = os.path.basename(booster_path)
+            
+            # Left uncompressed so load_model can memory-map the arrays
+            joblib.dump(bundle, model_path)
             logger.info(f"Model saved to {model_path}")
         except Exception as e:
             logger.error(f"Error saving model: {e}")
     
     def load_model(self, model_path: str):
-        """Load trained model"""
+        """Load trained model (and its scaler/vectorizer when saved together)
+        
+        XGBoost trees are read from the .ubj file saved next to model_path.
+        """
         try:
-            self.model = joblib.load(model_path)
+            # Arrays are memory-mapped read-only, so worker processes share the pages
+            saved = joblib.load(model_path, mmap_mode='r')
+            if isinstance(saved, dict):
+                model = saved['model']
+                if saved.get('booster_file'):
+                    # Raises when the .ubj is missing, leaving no half-loaded model behind
+                    model = xgb.XGBClassifier()
+                    model.load_model(os.path.join(os.path.dirname(model_path), saved['booster_file']))
+                self.model = model
+                self.scaler = saved['scaler']
+                self._inv_scale = None
+                if saved.get('vectorizer') is not None:
+                    self.vectorizer = saved['vectorizer']
+            else:
+                # Older files hold only the model
+                self.model = saved
+            self._booster = None
+            self._prediction_cache.clear()
             logger.info(f"Model loaded from {model_path}")
         except Exception as e:
             logger.error(f"Error loading model: {e}")
@@ -182,16 +372,23 @@ class PhishingDetector:
         """Load vectorizer"""
         try:
             self.vectorizer = joblib.load(vectorizer_path)
+            self._prediction_cache.clear()
             logger.info(f"Vectorizer loaded from {vectorizer_path}")
         except Exception as e:
             logger.error(f"Error loading vectorizer: {e}")
     
-    def get_feature_importance(self) -> Dict[str, float]:
-        """Get feature importance from model"""
+    def get_feature_importance(self, top_k: int = 20) -> Dict[str, float]:
+        """Get the top_k most important features from model, most important first"""
         try:
             if hasattr(self.model, 'feature_importances_'):
                 importances = self.model.feature_importances_
-                return {f'feature_{i}': imp for i, imp in enumerate(importances)}
+                top_k = min(top_k, len(importances))
+                if top_k <= 0:
+                    return {}
+                # Select the top_k in linear time, then sort only those
+                idx = np.argpartition(importances, -top_k)[-top_k:]
+                idx = idx[np.argsort(-importances[idx], kind='stable')]
+                return {f'feature_{i}': float(importances[i]) for i in idx}
         except Exception as e:
             logger.error(f"Error getting feature importance: {e}")
         
@@ -199,16 +396,25 @@ class PhishingDetector:
     
     def evaluate(self, X_text: list, X_features: np.ndarray, y: np.ndarray) -> Dict:
         """Evaluate model performance"""
+        try:
+            with config_context(assume_finite=True):
+                X_text_vectorized = self.vectorizer.transform(X_text)
+            return self.evaluate_cached(X_text_vectorized, X_features, y)
+        except Exception as e:
+            logger.error(f"Error evaluating model: {e}")
+            return {}
+    
+    def evaluate_cached(self, X_text_vectorized: sp.csr_matrix, X_features: np.ndarray, y: np.ndarray) -> Dict:
+        """Evaluate model performance on texts already transformed by self.vectorizer"""
         try:
             from sklearn.metrics import confusion_matrix, precision_score, recall_score, f1_score, roc_auc_score
             
-            X_text_vectorized = self.vectorizer.transform(X_text)
-            X_text_vectorized = X_text_vectorized.toarray()
-            X_combined = np.hstack([X_text_vectorized, X_features])
-            X_scaled = self.scaler.transform(X_combined)
-            
-            predictions = self.model.predict(X_scaled)
-            probabilities = self.model.predict_proba(X_scaled)[:, 1]
+            with config_context(assume_finite=True):
+                X_scaled = self._combine(X_text_vectorized, X_features)
+                
+                proba = self._model_predict_proba(X_scaled)
+                predictions = self.model.classes_.take(proba.argmax(axis=1))
+            probabilities = proba[:, 1]
             
             cm = confusion_matrix(y, predictions)
             
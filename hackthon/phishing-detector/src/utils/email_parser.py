@@ -1,5 +1,10 @@
 import re
 import email
+import email.policy
+import functools
+import itertools
+import socket
+from bisect import bisect_right
 from email.mime.text import MIMEText
 from typing import Dict, List, Tuple
 from urllib.parse import urlparse
@@ -7,6 +12,13 @@ import logging
 
 logger = logging.getLogger(__name__)
 
+# Compiled once at import and shared by every parser
+_EMAIL_RE = re.compile(r'[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}')
+# Flat character class equivalent to the old per-character alternation:
+# '$-_' is the range 0x24-0x5F, which already covers digits, A-Z, '%' and most punctuation
+_URL_RE = re.compile(r'https?://[!$-_a-z]+')
+_VALIDATE_RE = re.compile(r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$')
+
 class EmailParser:
     """Parse and extract features from email messages"""
     
@@ -18,55 +30,70 @@ class EmailParser:
         'prove identity', 'confirm identity', 'billing problem',
         'payment issue', 'claim', 'refund', 'tax return'
     ]
-    
-    def __init__(self):
-        self.email_pattern = re.compile(r'[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}')
-        self.url_pattern = re.compile(
-            r'http[s]?://(?:[a-zA-Z]|[0-9]|[$-_@.&+]|[!*\\(\\),]|(?:%[0-9a-fA-F][0-9a-fA-F]))+'
-        )
+    # All keywords in one pass; longest first so 'confirm identity' wins over 'confirm'
+    PHISHING_KEYWORDS_RE = re.compile(
+        r'\b(?:' + '|'.join(map(re.escape, sorted(PHISHING_KEYWORDS, key=len, reverse=True))) + r')\b',
+        re.IGNORECASE
+    )
+    URGENT_KEYWORDS_RE = re.compile(r'\b(?:urgent|immediate|action required)\b', re.IGNORECASE)
     
     def parse_email(self, email_content: str) -> Dict:
         """Parse email content and extract features"""
         try:
-            msg = email.message_from_string(email_content)
+            msg = email.message_from_string(email_content, policy=email.policy.default)
             
             return {
-                'subject': msg.get('Subject', ''),
-                'sender': msg.get('From', ''),
-                'recipient': msg.get('To', ''),
+                'subject': str(msg.get('Subject', '')),
+                'sender': str(msg.get('From', '')),
+                'recipient': str(msg.get('To', '')),
                 'body': self._get_body(msg),
                 'urls': self._extract_urls(email_content),
                 'emails': self._extract_emails(email_content),
-                'headers': dict(msg.items())
+                'has_attachment': self._has_attachment(msg)
             }
         except Exception as e:
             logger.error(f"Error parsing email: {e}")
             return {}
     
+    def _has_attachment(self, msg) -> bool:
+        """Check whether any MIME part is marked 'Content-Disposition: attachment'"""
+        return any(part.get_content_disposition() == 'attachment' for part in msg.walk())
+    
     def _get_body(self, msg) -> str:
-        """Extract email body"""
-        body = ""
-        if msg.is_multipart():
-            for part in msg.walk():
-                if part.get_content_type() == "text/plain":
-                    try:
-                        body = part.get_payload(decode=True).decode('utf-8', errors='ignore')
-                        break
-                    except Exception as e:
-                        logger.warning(f"Error decoding email part: {e}")
-        else:
-            body = msg.get_payload(decode=True).decode('utf-8', errors='ignore')
-        return body
+        """Extract email body (the text/plain part)"""
+        part = msg.get_body(preferencelist=('plain',))
+        if part is None:
+            if msg.is_multipart():
+                return ""
+            # Single-part message of another type: use its payload as before
+            part = msg
+        try:
+            content = part.get_content()
+        except Exception as e:
+            logger.warning(f"Error decoding email part: {e}")
+            return part.get_payload(decode=True).decode('utf-8', errors='ignore')
+        if isinstance(content, bytes):
+            # Non-text part (e.g. application/octet-stream): decode the raw payload
+            return content.decode('utf-8', errors='ignore')
+        # Anything else (an attached message/* object) has no plain body
+        return content if isinstance(content, str) else ""
     
     def _extract_urls(self, content: str) -> List[str]:
         """Extract all URLs from email"""
-        urls = self.url_pattern.findall(content)
-        return list(set(urls))  # Remove duplicates
+        return list({m.group(0) for m in _URL_RE.finditer(content)})  # Remove duplicates
+    
+    def extract_urls_batch(self, contents: List[str]) -> List[List[str]]:
+        """Extract the URLs of many emails with one regex scan over all of them"""
+        # '\n' never occurs inside a URL match, so no match spans two emails
+        starts = list(itertools.accumulate((len(c) + 1 for c in contents[:-1]), initial=0))
+        found = [set() for _ in contents]
+        for m in _URL_RE.finditer('\n'.join(contents)):
+            found[bisect_right(starts, m.start()) - 1].add(m.group(0))
+        return [list(urls) for urls in found]
     
     def _extract_emails(self, content: str) -> List[str]:
         """Extract all email addresses"""
-        emails = self.email_pattern.findall(content)
-        return list(set(emails))
+        return list({m.group(0) for m in _EMAIL_RE.finditer(content)})
     
     def extract_features(self, parsed_email: Dict) -> Dict:
         """Extract features for ML model"""
@@ -81,10 +108,9 @@ class EmailParser:
             'subject_length': len(subject),
             'body_length': len(body),
             'url_count': len(urls),
-            'suspicious_keyword_count': sum(1 for keyword in self.PHISHING_KEYWORDS 
-                                           if keyword in combined_text),
-            'urgent_keywords': sum(1 for word in ['urgent', 'immediate', 'action required'] 
-                                  if word in combined_text),
+            # Number of distinct keywords present
+            'suspicious_keyword_count': len({m.lower() for m in self.PHISHING_KEYWORDS_RE.findall(combined_text)}),
+            'urgent_keywords': len({m.lower() for m in self.URGENT_KEYWORDS_RE.findall(combined_text)}),
             'has_url': len(urls) > 0,
             'has_multiple_urls': len(urls) > 1,
             'sender_domain_suspicious': self._check_suspicious_sender(sender),
@@ -95,12 +121,13 @@ class EmailParser:
     
     def _check_suspicious_sender(self, sender: str) -> bool:
         """Check if sender domain is suspicious"""
-        suspicious_domains = ['gmail.com', 'yahoo.com', 'hotmail.com', 'outlook.com']
+        suspicious_domains = ('gmail.com', 'yahoo.com', 'hotmail.com', 'outlook.com')
         try:
-            domain = sender.split('@')[1].lower() if '@' in sender else ''
+            sender_lower = sender.lower()
+            domain = sender_lower.split('@')[1] if '@' in sender_lower else ''
             # If sender uses common email service with generic name, might be suspicious
-            if any(domain.endswith(sd) for sd in suspicious_domains):
-                if 'admin' in sender.lower() or 'support' in sender.lower():
+            if domain.endswith(suspicious_domains):
+                if 'admin' in sender_lower or 'support' in sender_lower:
                     return True
         except Exception as e:
             logger.warning(f"Error checking sender: {e}")
@@ -110,8 +137,7 @@ class EmailParser:
     @staticmethod
     def validate_email(email_str: str) -> bool:
         """Validate email format"""
-        pattern = re.compile(r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$')
-        return bool(pattern.match(email_str))
+        return bool(_VALIDATE_RE.match(email_str))
 
 
 class URLAnalyzer:
@@ -123,6 +149,8 @@ class URLAnalyzer:
         r'(?:paypal|amazon|apple|microsoft|google|bank)',  # Impersonation
         r'(?:bit\.ly|tinyurl|short\.link)',  # URL shorteners
     ]
+    # All patterns in one compiled search
+    SUSPICIOUS_PATTERNS_RE = re.compile('|'.join(SUSPICIOUS_PATTERNS), re.IGNORECASE)
     
     def __init__(self):
         pass
@@ -130,38 +158,29 @@ class URLAnalyzer:
     def analyze_url(self, url: str) -> Dict:
         """Analyze URL for phishing characteristics"""
         try:
-            parsed = urlparse(url)
-            
-            features = {
-                'url': url,
-                'domain': parsed.netloc,
-                'path': parsed.path,
-                'has_suspicious_pattern': self._check_suspicious_patterns(url),
-                'has_ip_address': self._has_ip_address(parsed.netloc),
-                'has_port': ':' in parsed.netloc and parsed.port is not None,
-                'subdomain_count': parsed.netloc.count('.'),
-                'url_length': len(url),
-                'uses_https': parsed.scheme == 'https',
-                'similarity_to_legitimate': 0  # To be computed
-            }
-            
-            return features
+            # Fresh dict per call, so callers may modify it without touching the cache
+            return dict(zip(_URL_ANALYSIS_FIELDS, _analyze_url(url)))
         except Exception as e:
             logger.error(f"Error analyzing URL: {e}")
             return {}
     
-    def _check_suspicious_patterns(self, url: str) -> bool:
+    @staticmethod
+    def _check_suspicious_patterns(url: str) -> bool:
         """Check for suspicious URL patterns"""
-        url_lower = url.lower()
-        for pattern in self.SUSPICIOUS_PATTERNS:
-            if re.search(pattern, url_lower):
-                return True
-        return False
+        return URLAnalyzer.SUSPICIOUS_PATTERNS_RE.search(url) is not None
     
-    def _has_ip_address(self, domain: str) -> bool:
+    @staticmethod
+    def _has_ip_address(domain: str) -> bool:
         """Check if domain is an IP address"""
-        parts = domain.split(':')[0].split('.')
-        return len(parts) == 4 and all(part.isdigit() and 0 <= int(part) <= 255 for part in parts)
+        host = domain.split(':', 1)[0]
+        # inet_aton also accepts short forms like '127.1'; require four parts
+        if host.count('.') != 3:
+            return False
+        try:
+            socket.inet_aton(host)
+            return True
+        except (OSError, ValueError):
+            return False
     
     def get_url_features_text(self, url_analysis: Dict) -> str:
         """Convert URL analysis to text for model"""
@@ -178,3 +197,30 @@ class URLAnalyzer:
             features.append('non_standard_port')
         
         return ' '.join(features) if features else 'clean_url'
+
+
+_URL_ANALYSIS_FIELDS = (
+    'url', 'domain', 'path', 'has_suspicious_pattern', 'has_ip_address', 'has_port',
+    'subdomain_count', 'url_length', 'uses_https', 'similarity_to_legitimate'
+)
+
+@functools.lru_cache(maxsize=4096)
+def _analyze_url(url: str) -> Tuple:
+    """URLAnalyzer.analyze_url values in _URL_ANALYSIS_FIELDS order
+    
+    Memoized by URL: the same links recur within and across emails in batch scans.
+    Exceptions (e.g. an invalid port) are not cached.
+    """
+    parsed = urlparse(url)
+    return (
+        url,
+        parsed.netloc,
+        parsed.path,
+        URLAnalyzer._check_suspicious_patterns(url),
+        URLAnalyzer._has_ip_address(parsed.netloc),
+        ':' in parsed.netloc and parsed.port is not None,
+        parsed.netloc.count('.'),
+        len(url),
+        parsed.scheme == 'https',
+        0  # similarity_to_legitimate: to be computed
+    )
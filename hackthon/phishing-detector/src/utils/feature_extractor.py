@@ -1,13 +1,58 @@
 import re
-from typing import Dict, List
+import functools
+from collections import Counter
+import numpy as np
+from typing import Dict, List, Tuple
 from .email_parser import EmailParser, URLAnalyzer
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Per-URL risk weights in tenths for: IP host, suspicious pattern, no HTTPS,
+# URL longer than 100 characters, suspicious TLD
+_URL_RISK_WEIGHTS = np.array([3, 3, 2, 1, 1])
+
+# Every byte except ASCII 'A'-'Z'; deleting these leaves only the capitals
+_NON_UPPERCASE_BYTES = bytes(b for b in range(256) if not 65 <= b <= 90)
+
+def _keyword_scanner(categories: List[List[str]]) -> Tuple[re.Pattern, Dict[str, Tuple[int, ...]]]:
+    """Build one pattern over every keyword plus the hits each matched keyword adds per category
+    
+    Keywords match as substrings, like str.count and quick_features: the lookahead
+    reports the longest keyword starting at each position, and that match is
+    credited with every keyword it starts with ('expired' also counts for
+    'expire', 'verifying' for 'verify').
+    """
+    keywords = sorted({word for words in categories for word in words}, key=len, reverse=True)
+    pattern = re.compile('(?=(' + '|'.join(map(re.escape, keywords)) + '))')
+    credits = {
+        keyword: tuple(sum(keyword.startswith(word) for word in words) for words in categories)
+        for keyword in keywords
+    }
+    return pattern, credits
+
 class FeatureExtractor:
     """Extract comprehensive features from emails and URLs"""
     
+    # Keyword lists for the urgent, financial, personal and action word counts
+    # and the urgency score, all counted in a single regex pass over the text
+    KEYWORD_CATEGORIES = [
+        ['urgent', 'immediate', 'critical', 'expire', 'expired',
+         'confirm', 'verify', 'validate', 'act now', 'limited time'],
+        ['payment', 'billing', 'credit card', 'account', 'bank',
+         'refund', 'tax', 'invoice', 'transaction', 'unauthorized'],
+        ['identity', 'password', 'personal information', 'ssn',
+         'driver license', 'social security', 'prove', 'confirm identity'],
+        ['click', 'download', 'install', 'open', 'submit', 'update',
+         'reset', 'change', 'confirm', 'respond'],
+        ['!', 'urgent', 'immediate', 'confirm', 'verify'],
+    ]
+    KEYWORD_RE, KEYWORD_CREDITS = _keyword_scanner(KEYWORD_CATEGORIES)
+    SUSPICIOUS_SENDER_RE = re.compile(r'admin|support|noreply|notification|no-reply|donotreply|mailer',
+                                      re.IGNORECASE)
+    # TLD must end the host: followed by a port, path, query, fragment or the end of the URL
+    SUSPICIOUS_TLD_RE = re.compile(r'\.(?:tk|ml|ga|cf|top|pw|xyz)(?:[/?#:]|$)', re.IGNORECASE)
+    
     def __init__(self):
         self.email_parser = EmailParser()
         self.url_analyzer = URLAnalyzer()
@@ -30,16 +75,17 @@ class FeatureExtractor:
             'url_count': len(urls),
             'email_count': len(parsed_email.get('emails', [])),
             'has_url': len(urls) > 0,
-            'has_attachment': 'attachment' in str(parsed_email.get('headers', {})).lower(),
+            'has_attachment': parsed_email.get('has_attachment', False),
         }
         
         # Text-based features
+        urgent, financial, personal, action, urgency = self._count_keywords(combined_text)
         text_features = {
-            'urgent_words': self._count_urgent_words(combined_text),
-            'financial_words': self._count_financial_words(combined_text),
-            'personal_words': self._count_personal_words(combined_text),
-            'action_words': self._count_action_words(combined_text),
-            'urgency_score': self._calculate_urgency_score(combined_text),
+            'urgent_words': urgent,
+            'financial_words': financial,
+            'personal_words': personal,
+            'action_words': action,
+            'urgency_score': min(urgency / 10, 1.0),  # Normalize to 0-1
         }
         
         # URL features
@@ -78,6 +124,7 @@ class FeatureExtractor:
         
         features = {
             'url': url,
+            'domain': analysis.get('domain', ''),
             'has_ip': analysis.get('has_ip_address', False),
             'has_suspicious_pattern': analysis.get('has_suspicious_pattern', False),
             'url_length': analysis.get('url_length', 0),
@@ -89,66 +136,36 @@ class FeatureExtractor:
         
         return features
     
-    def _count_urgent_words(self, text: str) -> int:
-        """Count urgent/threatening words"""
-        urgent_words = ['urgent', 'immediate', 'critical', 'expire', 'expired',
-                       'confirm', 'verify', 'validate', 'act now', 'limited time']
-        return sum(text.count(word) for word in urgent_words)
-    
-    def _count_financial_words(self, text: str) -> int:
-        """Count financial-related words"""
-        financial_words = ['payment', 'billing', 'credit card', 'account', 'bank',
-                          'refund', 'tax', 'invoice', 'transaction', 'unauthorized']
-        return sum(text.count(word) for word in financial_words)
-    
-    def _count_personal_words(self, text: str) -> int:
-        """Count personal/identity words"""
-        personal_words = ['identity', 'password', 'personal information', 'ssn',
-                         'driver license', 'social security', 'prove', 'confirm identity']
-        return sum(text.count(word) for word in personal_words)
-    
-    def _count_action_words(self, text: str) -> int:
-        """Count action-oriented words"""
-        action_words = ['click', 'download', 'install', 'open', 'submit', 'update',
-                       'reset', 'change', 'confirm', 'respond']
-        return sum(text.count(word) for word in action_words)
-    
-    def _calculate_urgency_score(self, text: str) -> float:
-        """Calculate urgency score (0-1)"""
-        urgent_indicators = ['!', 'urgent', 'immediate', 'confirm', 'verify']
-        count = sum(text.count(word) for word in urgent_indicators)
-        # Normalize to 0-1
-        return min(count / 10, 1.0)
+    def _count_keywords(self, text: str) -> List[int]:
+        """Count keyword occurrences in lowercased text for every KEYWORD_CATEGORIES list in one pass"""
+        counts = [0] * len(self.KEYWORD_CATEGORIES)
+        for keyword, hits in Counter(self.KEYWORD_RE.findall(text)).items():
+            for category, credit in enumerate(self.KEYWORD_CREDITS[keyword]):
+                counts[category] += credit * hits
+        return counts
     
     def _analyze_urls(self, urls: List[str]) -> Dict:
         """Analyze list of URLs"""
         if not urls:
             return {'url_risk_score': 0, 'suspicious_urls': 0}
         
-        suspicious_count = 0
-        risk_scores = []
-        
+        flags = []
         for url in urls:
             features = self.extract_url_features(url)
-            risk = 0
-            if features['has_ip']:
-                risk += 0.3
-            if features['has_suspicious_pattern']:
-                risk += 0.3
-            if not features['uses_https']:
-                risk += 0.2
-            if features['url_length'] > 100:
-                risk += 0.1
-            if features['suspicious_tld']:
-                risk += 0.1
-            
-            risk_scores.append(min(risk, 1.0))
-            if risk > 0.5:
-                suspicious_count += 1
+            flags.append((
+                features['has_ip'],
+                features['has_suspicious_pattern'],
+                not features['uses_https'],
+                features['url_length'] > 100,
+                features['suspicious_tld'],
+            ))
+        
+        # Integer tenths keep the 'risk > 0.5' comparison exact
+        risks = np.minimum(np.array(flags, dtype=np.int64) @ _URL_RISK_WEIGHTS, 10)
         
         return {
-            'url_risk_score': sum(risk_scores) / len(risk_scores),
-            'suspicious_urls': suspicious_count,
+            'url_risk_score': float(risks.mean()) / 10,
+            'suspicious_urls': int(np.count_nonzero(risks > 5)),
         }
     
     def _check_domain_mismatch(self, sender: str, urls: List[str]) -> bool:
@@ -170,21 +187,18 @@ class FeatureExtractor:
     
     def _is_suspicious_sender(self, sender: str) -> bool:
         """Check if sender looks suspicious"""
-        suspicious_patterns = ['admin', 'support', 'noreply', 'notification',
-                              'no-reply', 'donotreply', 'mailer']
-        sender_lower = sender.lower()
-        
-        return any(pattern in sender_lower for pattern in suspicious_patterns)
+        return self.SUSPICIOUS_SENDER_RE.search(sender) is not None
     
     def _count_caps_ratio(self, text: str) -> float:
         """Calculate ratio of uppercase letters"""
         if len(text) == 0:
             return 0
-        caps = sum(1 for c in text if c.isupper())
+        # Count ASCII capitals with one C-level byte scan
+        caps = len(text.encode('ascii', 'ignore').translate(None, _NON_UPPERCASE_BYTES))
         return caps / len(text)
     
-    def _check_suspicious_tld(self, url: str) -> bool:
-        """Check for suspicious top-level domains"""
-        suspicious_tlds = ['.tk', '.ml', '.ga', '.cf', '.top', '.pw', '.xyz']
-        url_lower = url.lower()
-        return any(tld in url_lower for tld in suspicious_tlds)
+    @staticmethod
+    @functools.lru_cache(maxsize=4096)
+    def _check_suspicious_tld(url: str) -> bool:
+        """Check for suspicious top-level domains (memoized by URL)"""
+        return FeatureExtractor.SUSPICIOUS_TLD_RE.search(url) is not None
@@ -0,0 +1,96 @@
+import re
+import numpy as np
+import pandas as pd
+from joblib import Parallel, delayed, effective_n_jobs
+
+# Lightweight 16-feature vectors built from plain text alone (no email parsing),
+# as used by the training scripts for both the training set and the test cases
+
+# Each keyword feature counts the distinct words of its group found in the lowercased text
+URGENT_WORDS = ['urgent', 'immediate', 'confirm', 'verify', 'click', 'action', 'limited', 'expire']
+FINANCIAL_WORDS = ['payment', 'account', 'credit', 'verify', 'bank', 'billing', 'transaction']
+PERSONAL_WORDS = ['password', 'identity', 'ssn', 'security number']
+ACTION_WORDS = ['click', 'download', 'update', 'reset', 'confirm', 'verify']
+ADMIN_WORDS = ['admin', 'support']
+KEYWORD_GROUPS = [URGENT_WORDS, FINANCIAL_WORDS, PERSONAL_WORDS, ACTION_WORDS, ADMIN_WORDS]
+
+# Below this many texts process startup costs more than parallel chunks save
+PARALLEL_MIN_TEXTS = 1000
+
+# Every keyword of every group, longest first: the pattern reports the longest
+# keyword starting at each position, and the lookahead lets matches overlap
+KEYWORDS = sorted({w for group in KEYWORD_GROUPS for w in group}, key=len, reverse=True)
+KEYWORD_INDEX = {w: i for i, w in enumerate(KEYWORDS)}
+KEYWORD_RE = re.compile('(?=(' + '|'.join(map(re.escape, KEYWORDS)) + '))')
+# KEYWORD_PREFIXES[i, j]: a match of KEYWORDS[i] is also an occurrence of KEYWORDS[j]
+KEYWORD_PREFIXES = np.array([[k.startswith(w) for w in KEYWORDS] for k in KEYWORDS])
+# KEYWORD_MEMBERSHIP[j, g]: KEYWORDS[j] belongs to KEYWORD_GROUPS[g]
+KEYWORD_MEMBERSHIP = np.array([[w in group for group in KEYWORD_GROUPS] for w in KEYWORDS], dtype=int)
+
+def count_keyword_groups(lower: pd.Series) -> np.ndarray:
+    """Distinct keywords of each KEYWORD_GROUPS group per text, in one regex pass per text"""
+    found = lower.str.findall(KEYWORD_RE).explode().dropna()
+    hits = np.zeros((len(lower), len(KEYWORDS)), dtype=bool)
+    hits[found.index.to_numpy(), found.map(KEYWORD_INDEX).to_numpy(dtype=np.intp)] = True
+    return (hits @ KEYWORD_PREFIXES) @ KEYWORD_MEMBERSHIP
+
+def build_feature_matrix(texts: list) -> np.ndarray:
+    """Build the 16 numeric features for all texts, one vectorized column at a time"""
+    text = pd.Series(texts, dtype=object)
+    lower = text.str.lower()
+    length = text.str.len()
+    bangs = text.str.count('!')
+    counts = count_keyword_groups(lower)
+    
+    # Columns in the order the detector expects, written straight into one
+    # float32 block; url_risk_score, suspicious_urls, sender_domain_mismatch,
+    # excessive_links and unusual_capitals are left at zero
+    X = np.zeros((len(text), 16), dtype=np.float32)
+    X[:, 0] = text.str.split().str[0].fillna('').str.len()  # subject_length
+    X[:, 1] = length  # body_length
+    X[:, 2] = text.str.count('http') + text.str.count('http://')  # url_count
+    X[:, 3:7] = counts[:, :4]  # urgent, financial, personal, action words
+    X[:, 7] = np.minimum(bangs / 10, 1.0)  # urgency_score
+    X[:, 11] = counts[:, 4] > 0  # admin/support mentioned
+    X[:, 13] = length < 50
+    X[:, 14] = bangs > 2
+    return X
+
+def build_feature_matrix_parallel(texts: list, n_jobs: int = -1) -> np.ndarray:
+    """build_feature_matrix over one chunk of texts per worker process
+    
+    Falls back to a single in-process call for fewer than PARALLEL_MIN_TEXTS
+    texts or when only one worker is available.
+    """
+    workers = effective_n_jobs(n_jobs)
+    if len(texts) < PARALLEL_MIN_TEXTS or workers < 2:
+        return build_feature_matrix(texts)
+    chunk_size = -(-len(texts) // workers)
+    chunks = [texts[i:i + chunk_size] for i in range(0, len(texts), chunk_size)]
+    blocks = Parallel(n_jobs=workers, backend='loky')(delayed(build_feature_matrix)(c) for c in chunks)
+    return np.vstack(blocks)
+
+def build_features(text: str) -> np.ndarray:
+    """Build the 16 numeric features for a single text, same as its build_feature_matrix row
+    
+    Plain-Python path for one text: a single keyword sweep of the lowercased
+    text plus C-level counts, without the per-call pandas overhead.
+    """
+    hits = np.zeros(len(KEYWORDS), dtype=bool)
+    for match in KEYWORD_RE.finditer(text.lower()):
+        hits[KEYWORD_INDEX[match.group(1)]] = True
+    counts = (hits @ KEYWORD_PREFIXES) @ KEYWORD_MEMBERSHIP
+    words = text.split(maxsplit=1)
+    length = len(text)
+    bangs = text.count('!')
+    
+    x = np.zeros(16, dtype=np.float32)
+    x[0] = len(words[0]) if words else 0  # subject_length
+    x[1] = length  # body_length
+    x[2] = text.count('http') + text.count('http://')  # url_count
+    x[3:7] = counts[:4]  # urgent, financial, personal, action words
+    x[7] = min(bangs / 10, 1.0)  # urgency_score
+    x[11] = counts[4] > 0  # admin/support mentioned
+    x[13] = length < 50
+    x[14] = bangs > 2
+    return x
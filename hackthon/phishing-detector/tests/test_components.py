@@ -5,16 +5,34 @@ import os
 sys.path.insert(0, os.path.dirname(__file__))
 
 import unittest
+import asyncio
+import signal
+import subprocess
+import tempfile
+import threading
+import warnings
+import numpy as np
+import orjson
+from fastapi.testclient import TestClient
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.exceptions import InconsistentVersionWarning
 from src.utils.email_parser import EmailParser, URLAnalyzer
 from src.utils.feature_extractor import FeatureExtractor
+from src.utils.quick_features import build_feature_matrix, build_feature_matrix_parallel, build_features
 from src.models.detector import PhishingDetector
 from src.alerts.alert_manager import AlertManager, AlertSeverity
+from src.api import routes
+from src.app import create_app
+from src.config import Config
+from train_model import load_training_data
+from train_advanced import load_split
 
 class TestEmailParser(unittest.TestCase):
     """Test email parser functionality"""
     
-    def setUp(self):
-        self.parser = EmailParser()
+    @classmethod
+    def setUpClass(cls):
+        cls.parser = EmailParser()
     
     def test_email_validation(self):
         """Test email validation"""
@@ -28,6 +46,57 @@ class TestEmailParser(unittest.TestCase):
         urls = self.parser._extract_urls(text)
         self.assertEqual(len(urls), 2)
     
+    def test_url_extraction_batch(self):
+        """Test batch URL extraction matches per-email extraction"""
+        texts = [
+            "Visit https://example.com or http://test.org",
+            "",
+            "no links here",
+            "http://a.com/x http://a.com/x\nhttp://b.com",
+        ]
+        batch = self.parser.extract_urls_batch(texts)
+        
+        self.assertEqual(len(batch), len(texts))
+        for text, urls in zip(texts, batch):
+            self.assertEqual(sorted(urls), sorted(self.parser._extract_urls(text)))
+        self.assertEqual(self.parser.extract_urls_batch([]), [])
+    
+    def test_multipart_body(self):
+        """Test the text/plain part is used as the body"""
+        message = (
+            "Subject: Hello\n"
+            "Content-Type: multipart/alternative; boundary=\"XX\"\n\n"
+            "--XX\nContent-Type: text/html\n\n<b>html body</b>\n"
+            "--XX\nContent-Type: text/plain\n\nplain body\n"
+            "--XX--\n"
+        )
+        parsed = self.parser.parse_email(message)
+        
+        self.assertEqual(parsed['subject'], 'Hello')
+        self.assertEqual(parsed['body'].strip(), 'plain body')
+        self.assertFalse(parsed['has_attachment'])
+    
+    def test_non_text_single_part_body(self):
+        """Test a single non-text part gives its decoded payload as the body"""
+        parsed = self.parser.parse_email("Subject: hi\nContent-Type: application/octet-stream\n\nabc")
+        
+        self.assertEqual(parsed['body'], 'abc')
+    
+    def test_attachment_detection(self):
+        """Test a part with an attachment disposition is detected"""
+        message = (
+            "Subject: Invoice\n"
+            "Content-Type: multipart/mixed; boundary=\"XX\"\n\n"
+            "--XX\nContent-Type: text/plain\n\nSee attached\n"
+            "--XX\nContent-Type: application/pdf\n"
+            "Content-Disposition: attachment; filename=\"invoice.pdf\"\n\nJVBERi0=\n"
+            "--XX--\n"
+        )
+        parsed = self.parser.parse_email(message)
+        
+        self.assertTrue(parsed['has_attachment'])
+        self.assertEqual(parsed['body'].strip(), 'See attached')
+    
     def test_suspicious_sender_detection(self):
         """Test suspicious sender detection"""
         suspicious = 'admin@gmail.com'
@@ -39,8 +108,9 @@ class TestEmailParser(unittest.TestCase):
 class TestURLAnalyzer(unittest.TestCase):
     """Test URL analyzer functionality"""
     
-    def setUp(self):
-        self.analyzer = URLAnalyzer()
+    @classmethod
+    def setUpClass(cls):
+        cls.analyzer = URLAnalyzer()
     
     def test_ip_detection(self):
         """Test IP address detection"""
@@ -78,8 +148,9 @@ class TestURLAnalyzer(unittest.TestCase):
 class TestFeatureExtractor(unittest.TestCase):
     """Test feature extraction"""
     
-    def setUp(self):
-        self.extractor = FeatureExtractor()
+    @classmethod
+    def setUpClass(cls):
+        cls.extractor = FeatureExtractor()
     
     def test_phishing_email_features(self):
         """Test feature extraction from phishing email"""
@@ -108,6 +179,307 @@ class TestFeatureExtractor(unittest.TestCase):
         
         self.assertEqual(features['urgent_words'], 0)
         self.assertLess(features['action_words'], 2)
+    
+    def test_keyword_substring_counts(self):
+        """Test keywords are counted as substrings, like str.count per keyword"""
+        text = "subject: verifying your expired passwords! reconfirm identity now!"
+        expected = [sum(text.count(word) for word in words)
+                    for words in FeatureExtractor.KEYWORD_CATEGORIES]
+        
+        counts = self.extractor._count_keywords(text)
+        
+        self.assertEqual(counts, expected)
+        self.assertEqual(counts[0], 4)  # 'verify', 'expire', 'expired', 'confirm'
+        self.assertEqual(counts[2], 3)  # 'password', 'identity', 'confirm identity'
+    
+    def test_url_features(self):
+        """Test feature extraction from URL"""
+        features = self.extractor.extract_url_features("http://verify-paypal.tk/login")
+        
+        self.assertEqual(features['domain'], 'verify-paypal.tk')
+        self.assertTrue(features['suspicious_tld'])
+        self.assertFalse(features['uses_https'])
+
+class TestQuickFeatures(unittest.TestCase):
+    """Test text-only feature vectors"""
+    
+    def test_keyword_counts(self):
+        """Test distinct keywords are counted per group, including overlapping ones"""
+        features = build_features("Verify the transaction: verify your password! support")
+        
+        self.assertEqual(features.dtype, np.float32)
+        self.assertEqual(features.shape, (16,))
+        self.assertEqual(features[3], 2)  # urgent: 'verify', 'action' (in 'transaction')
+        self.assertEqual(features[4], 2)  # financial: 'verify', 'transaction'
+        self.assertEqual(features[5], 1)  # personal: 'password'
+        self.assertEqual(features[11], 1)  # 'support'
+    
+    def test_matrix_matches_single_texts(self):
+        """Test the batch builder gives the same rows as single texts"""
+        texts = ["URGENT!!! click http://x.tk", "", "Meeting notes for Friday"]
+        matrix = build_feature_matrix(texts)
+        
+        for i, text in enumerate(texts):
+            np.testing.assert_array_equal(matrix[i], build_features(text))
+    
+    def test_parallel_matrix_matches_serial(self):
+        """Test the chunked parallel builder keeps rows in order"""
+        texts = [f"verify account {i} now!" if i % 3 else "Meeting notes" for i in range(1500)]
+        
+        np.testing.assert_array_equal(build_feature_matrix_parallel(texts, n_jobs=2),
+                                      build_feature_matrix(texts))
+
+class TestTrainingData(unittest.TestCase):
+    """Test loading training samples from a file"""
+    
+    def test_invalid_rows_dropped(self):
+        """Test rows with missing cells, blank text or non-0/1 labels are dropped"""
+        with tempfile.TemporaryDirectory() as tmp:
+            data_path = os.path.join(tmp, 'data.csv')
+            with open(data_path, 'w') as f:
+                f.write('text,is_phishing\n'
+                        '"verify your account now",1\n'
+                        ',0\n'
+                        '"missing label",\n'
+                        '"meeting notes",0\n'
+                        '"bad label",2\n'
+                        '"text label",yes\n')
+            
+            with self.assertLogs('train_model', level='WARNING'):
+                df = load_training_data(data_path)
+        
+        self.assertEqual(df['text'].tolist(), ['verify your account now', 'meeting notes'])
+        np.testing.assert_array_equal(df['is_phishing'].to_numpy(dtype=np.int8), [1, 0])
+    
+    def test_split_cached_beside_data(self):
+        """Test the split is cached next to the data file and redone once the file changes"""
+        y = np.array([0, 1] * 10, dtype=np.int8)
+        with tempfile.TemporaryDirectory() as tmp:
+            data_path = os.path.join(tmp, 'data.csv')
+            with open(data_path, 'w') as f:
+                f.write('text,is_phishing\n')
+            
+            train_idx, test_idx = load_split(y, data_path)
+            cache_path = data_path + '.split.npz'
+            self.assertTrue(os.path.exists(cache_path))
+            self.assertEqual(len(test_idx), 4)
+            
+            # Reused while the file is unchanged: swapped indices come back as cached
+            with np.load(cache_path) as cached:
+                key = cached['key']
+            np.savez(cache_path, key=key, train_idx=test_idx, test_idx=train_idx)
+            cached_train, cached_test = load_split(y, data_path)
+            np.testing.assert_array_equal(cached_train, test_idx)
+            np.testing.assert_array_equal(cached_test, train_idx)
+            
+            # Recomputed once the file changes
+            with open(data_path, 'a') as f:
+                f.write('"new row",1\n')
+            new_train, new_test = load_split(y, data_path)
+            np.testing.assert_array_equal(new_train, train_idx)
+            np.testing.assert_array_equal(new_test, test_idx)
+
+class TestBatchExtraction(unittest.TestCase):
+    """Test batch feature extraction in worker processes"""
+    
+    def tearDown(self):
+        routes.shutdown_executors()
+    
+    @unittest.skipUnless(hasattr(signal, 'SIGKILL'), "needs SIGKILL")
+    def test_broken_pool_is_replaced(self):
+        """Test a batch still succeeds after an extraction worker dies, and the pool restarts"""
+        items = [{'url': f'http://example{i}.tk/login'} for i in range(routes.PARALLEL_EXTRACTION_MIN_ITEMS)]
+        
+        async def scan_twice_killing_workers():
+            await routes._extract_batch(items)
+            for pid in list(routes.extraction_pool._processes):
+                os.kill(pid, signal.SIGKILL)
+            after_kill = await routes._extract_batch(items)
+            restarted = await routes._extract_batch(items)
+            return after_kill, restarted
+        
+        workers = routes.EXTRACTION_WORKERS
+        routes.EXTRACTION_WORKERS = 2
+        try:
+            after_kill, restarted = asyncio.run(scan_twice_killing_workers())
+        finally:
+            routes.EXTRACTION_WORKERS = workers
+        
+        self.assertEqual([kind for kind, _ in after_kill], ['url'] * len(items))
+        self.assertEqual([kind for kind, _ in restarted], ['url'] * len(items))
+
+class _FailingDetector(PhishingDetector):
+    """Detector whose batch model call always raises"""
+    
+    def predict_batch(self, X_text, X_features):
+        raise RuntimeError('model failed')
+
+class _APITestCase(unittest.TestCase):
+    """Serves the app (lifespan included) with a small trained detector swapped in"""
+    
+    @classmethod
+    def setUpClass(cls):
+        cls.app = create_app('testing')
+        cls.client = TestClient(cls.app).__enter__()
+        cls.detector = TestPhishingDetector._train_detector()
+    
+    @classmethod
+    def tearDownClass(cls):
+        cls.client.__exit__(None, None, None)
+    
+    def setUp(self):
+        routes.init_api(self.app, self.detector)
+
+class TestAPI(_APITestCase):
+    """Test the HTTP routes"""
+    
+    def test_scan_email(self):
+        """Test an email scan returns a verdict and details"""
+        response = self.client.post('/api/v1/scan/email', json={
+            'email_content': 'Subject: Urgent\nFrom: admin@example.tk\n\nVerify your account at http://example.tk now!'
+        })
+        body = response.json()
+        
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(body['is_phishing'], (True, False))
+        self.assertIn(body['risk_level'], routes.RISK_LEVELS)
+        self.assertEqual(body['details']['subject'], 'Urgent')
+        self.assertEqual(body['details']['urls'], ['http://example.tk'])
+    
+    def test_scan_url(self):
+        """Test fast-path and model-scored URL scans"""
+        fast = self.client.post('/api/v1/scan/url', json={'url': 'https://example.com/'}).json()
+        scored = self.client.post('/api/v1/scan/url', json={'url': 'http://example.tk/login'}).json()
+        
+        self.assertEqual(fast['confidence'], routes.FAST_PATH_BENIGN_CONFIDENCE)
+        self.assertEqual(fast['details']['domain'], 'example.com')
+        self.assertEqual(scored['url'], 'http://example.tk/login')
+        self.assertTrue(scored['details']['suspicious_tld'])
+        self.assertIn(scored['risk_level'], routes.RISK_LEVELS)
+    
+    def test_model_info_and_health(self):
+        """Test model info and health report the loaded detector"""
+        info = self.client.get('/api/v1/model/info').json()
+        health = self.client.get('/api/v1/health').json()
+        
+        self.assertTrue(info['model_loaded'])
+        self.assertTrue(info['vectorizer_loaded'])
+        self.assertTrue(info['timestamp'].endswith('Z'))
+        self.assertEqual(health['status'], 'healthy')
+        self.assertTrue(health['model_loaded'])
+    
+    def test_validation_errors(self):
+        """Test invalid bodies get the {'error': ...} / 400 contract"""
+        missing = self.client.post('/api/v1/scan/email', json={})
+        invalid = self.client.post('/api/v1/scan/url', json={'url': ['not', 'a', 'string']})
+        
+        self.assertEqual(missing.status_code, 400)
+        self.assertEqual(missing.json(), {'error': 'Missing email_content'})
+        self.assertEqual(invalid.status_code, 400)
+        self.assertTrue(invalid.json()['error'].startswith('Invalid request: '))
+    
+    def test_index_etag(self):
+        """Test the frontend is served with an ETag and revalidates to 304"""
+        response = self.client.get('/')
+        etag = response.headers['etag']
+        revalidated = self.client.get('/', headers={'If-None-Match': etag})
+        
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('text/html', response.headers['content-type'])
+        self.assertEqual(revalidated.status_code, 304)
+        self.assertEqual(revalidated.headers['etag'], etag)
+        self.assertEqual(revalidated.content, b'')
+
+class TestAppLifespan(unittest.TestCase):
+    """Test app startup and shutdown"""
+    
+    def test_lifespan_stops_executors(self):
+        """Test startup attaches a detector and shutdown stops the inference pool"""
+        app = create_app('testing')
+        with TestClient(app) as client:
+            self.assertIsInstance(app.state.phishing_detector, PhishingDetector)
+            routes.init_api(app, TestPhishingDetector._train_detector())
+            client.post('/api/v1/scan/url', json={'url': 'http://example.tk/login'})
+            self.assertIsNotNone(routes.inference_executor)
+        
+        self.assertIsNone(routes.inference_executor)
+        self.assertIsNone(routes.extraction_pool)
+
+class TestBatchScan(_APITestCase):
+    """Test the streamed /scan/batch response"""
+    
+    ITEMS = [
+        {'email_content': 'Subject: Urgent\n\nVerify your account now!'},
+        {'url': 'https://example.com/'},  # decided by the fast path
+        {'name': 'neither email nor url'},
+        {'url': 'http://example.tk/login'},  # scored by the model
+        {'url': 'https://example.org/'},  # decided by the fast path
+    ]
+    
+    def setUp(self):
+        super().setUp()
+        # Two items per chunk: the ITEMS span three chunks, the last one partial
+        chunk_size = routes.BATCH_CHUNK_SIZE
+        routes.BATCH_CHUNK_SIZE = 2
+        self.addCleanup(setattr, routes, 'BATCH_CHUNK_SIZE', chunk_size)
+    
+    def scan(self, detector: PhishingDetector) -> dict:
+        routes.init_api(self.app, detector)
+        response = self.client.post('/api/v1/scan/batch', json={'items': self.ITEMS})
+        self.assertEqual(response.status_code, 200)
+        return orjson.loads(response.content)
+    
+    def test_results_in_input_order(self):
+        """Test the streamed body is JSON with one result per item, in order, across chunks"""
+        body = self.scan(self.detector)
+        results = body['results']
+        
+        self.assertEqual(body['total'], len(self.ITEMS))
+        self.assertEqual(len(results), len(self.ITEMS))
+        self.assertIn('timestamp', body)
+        self.assertEqual([r.get('type') for r in results], ['email', 'url', None, 'url', 'url'])
+        self.assertEqual([r.get('url') for r in results[3:]], ['http://example.tk/login', 'https://example.org/'])
+        self.assertEqual(results[2], {'error': 'Missing email_content or url'})
+        for i in (0, 1, 3, 4):
+            self.assertIn('confidence', results[i])
+    
+    def test_failed_model_call_keeps_fast_path_results(self):
+        """Test a raising model call turns only its own items into errors"""
+        results = self.scan(_FailingDetector())['results']
+        
+        self.assertEqual(results[0], {'error': 'model failed'})
+        self.assertEqual(results[3], {'error': 'model failed'})
+        for i in (1, 4):
+            self.assertEqual(results[i]['confidence'], routes.FAST_PATH_BENIGN_CONFIDENCE)
+            self.assertFalse(results[i]['is_phishing'])
+
+class TestLogging(unittest.TestCase):
+    """Test the queue-based log configuration"""
+    
+    def test_record_after_server_config_reaches_file(self):
+        """Test records logged after uvicorn applies the log config are written to the file"""
+        script = (
+            "import logging, logging.config, uvicorn\n"
+            "from src.logging_config import build_log_config, stop_listener\n"
+            "log_config = build_log_config({log_file!r})\n"
+            "logging.config.dictConfig(log_config)\n"
+            "logging.getLogger('probe').info('before server config')\n"
+            "stop_listener()\n"
+            "uvicorn.Config('src.app:app', log_config=log_config)\n"
+            "logging.getLogger('probe').info('after server config')\n"
+        )
+        with tempfile.TemporaryDirectory() as tmp:
+            log_file = os.path.join(tmp, 'test.log')
+            subprocess.run(
+                [sys.executable, '-c', script.format(log_file=log_file)],
+                cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                check=True, capture_output=True
+            )
+            with open(log_file) as f:
+                logged = f.read()
+        
+        self.assertIn('before server config', logged)
+        self.assertIn('after server config', logged)
 
 class TestAlertManager(unittest.TestCase):
     """Test alert management"""
@@ -126,6 +498,13 @@ class TestAlertManager(unittest.TestCase):
         self.assertIsNotNone(alert.alert_id)
         self.assertEqual(alert.severity, AlertSeverity.CRITICAL)
     
+    def test_alert_ids_unique_and_ordered(self):
+        """Test generated alert IDs are unique and increase over time"""
+        ids = [self.manager._generate_alert_id() for _ in range(100)]
+        
+        self.assertEqual(len(set(ids)), len(ids))
+        self.assertEqual(ids, sorted(ids))
+    
     def test_mark_alert_read(self):
         """Test marking alert as read"""
         alert = self.manager.create_alert(
@@ -150,6 +529,48 @@ class TestAlertManager(unittest.TestCase):
         
         alerts = self.manager.get_all_alerts()
         self.assertEqual(len(alerts), 3)
+        
+        newest = self.manager.get_all_alerts(limit=2)
+        self.assertEqual(newest, alerts[:2])
+    
+    def test_alert_history_is_bounded(self):
+        """Test history keeps only the newest max_alerts alerts"""
+        manager = AlertManager()
+        for i in range(manager.max_alerts + 5):
+            manager.create_alert(AlertSeverity.LOW, f"Alert {i}", {})
+        
+        self.assertEqual(len(manager.alert_history), manager.max_alerts)
+        self.assertEqual(manager.alert_history[0].message, "Alert 5")
+    
+    def test_handlers_notified_in_background(self):
+        """Test queued alerts reach per-alert and batch handlers"""
+        received = []
+        batches = []
+        self.manager.register_handler(received.append)
+        self.manager.register_handler(batches.append, batch=True)
+        
+        for i in range(3):
+            self.manager.create_alert(AlertSeverity.LOW, f"Alert {i}", {})
+        self.manager.flush()
+        
+        self.assertEqual([a.message for a in received], ["Alert 0", "Alert 1", "Alert 2"])
+        self.assertEqual(sum(len(b) for b in batches), 3)
+    
+    def test_alerts_after_close_delivered_synchronously(self):
+        """Test alerts created after close() reach handlers at once and flush() does not block"""
+        received = []
+        self.manager.register_handler(received.append)
+        self.manager.create_alert(AlertSeverity.LOW, "Before close", {})
+        self.manager.close()
+        self.manager.close()
+        
+        self.manager.create_alert(AlertSeverity.HIGH, "After close", {})
+        self.assertEqual([a.message for a in received], ["Before close", "After close"])
+        
+        flusher = threading.Thread(target=self.manager.flush, daemon=True)
+        flusher.start()
+        flusher.join(timeout=5)
+        self.assertFalse(flusher.is_alive())
     
     def test_alert_stats(self):
         """Test alert statistics"""
@@ -163,10 +584,49 @@ class TestAlertManager(unittest.TestCase):
         self.assertEqual(stats['by_severity']['critical'], 1)
         self.assertEqual(stats['by_severity']['high'], 1)
         self.assertEqual(stats['by_severity']['medium'], 1)
+        self.assertEqual(stats['unread_count'], 3)
+    
+    def test_alert_stats_follow_updates(self):
+        """Test statistics track reads and deletions"""
+        first = self.manager.create_alert(AlertSeverity.CRITICAL, "Test", {})
+        second = self.manager.create_alert(AlertSeverity.CRITICAL, "Test", {})
+        
+        self.manager.mark_alert_as_read(first.alert_id)
+        self.manager.mark_alert_as_read(first.alert_id)
+        self.manager.delete_alert(second.alert_id)
+        
+        stats = self.manager.get_stats()
+        
+        self.assertEqual(stats['total_active'], 1)
+        self.assertEqual(stats['by_severity']['critical'], 1)
+        self.assertEqual(stats['unread_count'], 0)
 
 class TestPhishingDetector(unittest.TestCase):
     """Test phishing detector model"""
     
+    TEXTS = [
+        'urgent verify your account password now',
+        'urgent confirm your bank account immediately',
+        'verify account password or it will be suspended',
+        'meeting notes for the project review',
+        'project review meeting moved to friday',
+        'lunch with the team on friday',
+    ]
+    LABELS = np.array([1, 1, 1, 0, 0, 0])
+    FEATURES = np.tile(np.arange(16, dtype=float), (len(TEXTS), 1))
+    
+    @classmethod
+    def setUpClass(cls):
+        cls.detector = cls._train_detector()
+    
+    @classmethod
+    def _train_detector(cls) -> PhishingDetector:
+        """A tiny detector trained on TEXTS"""
+        detector = PhishingDetector()
+        detector.create_model()
+        detector.train(cls.TEXTS, cls.FEATURES, cls.LABELS)
+        return detector
+    
     def test_detector_initialization(self):
         """Test detector initialization"""
         detector = PhishingDetector()
@@ -174,6 +634,96 @@ class TestPhishingDetector(unittest.TestCase):
         
         self.assertIsNotNone(detector.model)
         self.assertIsNotNone(detector.vectorizer)
+    
+    def test_predict_batch_matches_predict(self):
+        """Test batch prediction agrees with single predictions"""
+        predictions, confidences = self.detector.predict_batch(self.TEXTS, self.FEATURES)
+        
+        for i, text in enumerate(self.TEXTS):
+            prediction, confidence = self.detector.predict(text, self.FEATURES[i])
+            self.assertEqual(predictions[i], prediction)
+            self.assertAlmostEqual(confidences[i], confidence, places=5)
+        
+        # An already vectorized batch gives the same results, and is not modified
+        X_vectorized = self.detector.vectorizer.transform(self.TEXTS)
+        for _ in range(2):
+            _, cached_confidences = self.detector.predict_vectorized(X_vectorized, self.FEATURES)
+            np.testing.assert_allclose(cached_confidences, confidences)
+    
+    def test_predict_cached_until_retrained(self):
+        """Test repeated predictions are served from the cache, which retraining clears"""
+        # Own detector: this test retrains it and counts its cache entries
+        detector = self._train_detector()
+        
+        first = detector.predict(self.TEXTS[0], self.FEATURES[0])
+        self.assertEqual(detector.predict(self.TEXTS[0], self.FEATURES[0]), first)
+        self.assertEqual(len(detector._prediction_cache._entries), 1)
+        
+        detector.train(self.TEXTS, self.FEATURES, self.LABELS)
+        self.assertEqual(len(detector._prediction_cache._entries), 0)
+    
+    def test_predict_fallback_not_cached(self):
+        """Test the fallback result of an unfitted model is not cached"""
+        detector = PhishingDetector()
+        detector.create_model()
+        
+        self.assertEqual(detector.predict('verify your account', np.zeros(16)), (0, 0.5))
+        self.assertEqual(len(detector._prediction_cache._entries), 0)
+    
+    def test_save_and_load_model(self):
+        """Test a saved model reloads with its scaler and vectorizer"""
+        with tempfile.TemporaryDirectory() as tmp:
+            model_path = os.path.join(tmp, 'model.pkl')
+            self.detector.save_model(model_path)
+            if self.detector.use_xgboost:
+                self.assertTrue(os.path.exists(os.path.join(tmp, 'model.ubj')))
+            loaded = PhishingDetector(model_path)
+            
+            predictions, confidences = self.detector.predict_batch(self.TEXTS, self.FEATURES)
+            loaded_predictions, loaded_confidences = loaded.predict_batch(self.TEXTS, self.FEATURES)
+        
+        np.testing.assert_array_equal(loaded_predictions, predictions)
+        np.testing.assert_allclose(loaded_confidences, confidences)
+    
+    def test_load_model_without_booster_file(self):
+        """Test a bundle whose .ubj is missing does not load a half-built model"""
+        if not self.detector.use_xgboost:
+            self.skipTest("XGBoost not installed")
+        
+        with tempfile.TemporaryDirectory() as tmp:
+            model_path = os.path.join(tmp, 'model.pkl')
+            self.detector.save_model(model_path)
+            os.remove(os.path.join(tmp, 'model.ubj'))
+            loaded = PhishingDetector(model_path)
+        
+        self.assertIsNone(loaded.model)
+    
+    def test_shipped_model_loads(self):
+        """Test the model and vectorizer committed under src/models load and predict"""
+        with warnings.catch_warnings():
+            warnings.simplefilter('error', InconsistentVersionWarning)
+            detector = PhishingDetector(Config.MODEL_PATH, Config.VECTORIZER_PATH)
+        
+        self.assertIsNotNone(detector.model)
+        self.assertIsNotNone(detector.vectorizer)
+        predictions, confidences = detector.predict_batch(self.TEXTS, self.FEATURES)
+        self.assertEqual(len(predictions), len(self.TEXTS))
+        self.assertTrue(np.all((confidences >= 0) & (confidences <= 1)))
+    
+    def test_feature_importance_top_k(self):
+        """Test only the top_k features are returned, most important first"""
+        detector = PhishingDetector()
+        detector.model = RandomForestClassifier(n_estimators=5, random_state=0)
+        X = np.random.RandomState(0).rand(40, 8)
+        detector.model.fit(X, (X[:, 3] > 0.5).astype(int))
+        
+        top = detector.get_feature_importance(top_k=3)
+        values = list(top.values())
+        
+        self.assertEqual(len(top), 3)
+        self.assertEqual(next(iter(top)), 'feature_3')
+        self.assertEqual(values, sorted(values, reverse=True))
+        self.assertEqual(len(detector.get_feature_importance(top_k=100)), 8)
 
 if __name__ == '__main__':
     unittest.main()
@@ -4,9 +4,11 @@ PhishGuard - Advanced Model Training Script
 Trains XGBoost/Gradient Boosting models with enhanced features
 """
 
+import argparse
+import hashlib
 import numpy as np
 import pandas as pd
-from sklearn.model_selection import train_test_split
+from sklearn.model_selection import StratifiedShuffleSplit
 from sklearn.metrics import confusion_matrix, classification_report, roc_auc_score
 import sys
 import os
@@ -16,6 +18,7 @@ sys.path.insert(0, os.path.dirname(__file__))
 
 from src.models.detector import PhishingDetector
 from src.utils.feature_extractor import FeatureExtractor
+from src.utils.quick_features import build_feature_matrix_parallel, build_features
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -91,8 +94,76 @@ TRAINING_DATA = [
     },
 ]
 
-def train_model():
-    """Train the advanced phishing detection model"""
+# Unseen texts scored after training, with their expected label
+TEST_CASES = [
+    ("URGENT: Verify your account immediately or it will be suspended. Click here now!", 1),
+    ("Hi, just wanted to schedule a meeting for next week. Does Thursday work?", 0),
+    ("Your PayPal account requires immediate action. Confirm your password now.", 1),
+    ("Project update: Q3 results are ready for review in the system.", 0),
+    ("CRITICAL: Unusual activity detected. Verify identity immediately via link.", 1),
+]
+
+def load_split(y: np.ndarray, data_path: str = None):
+    """Stratified 80/20 train/test indices
+    
+    For a data file the indices are cached beside it (<data_path>.split.npz) and
+    reused while the file's size and modification time and the labels read from
+    it are unchanged, so the texts are never hashed.
+    """
+    splitter = StratifiedShuffleSplit(n_splits=1, test_size=0.2, random_state=42)
+    if data_path is None:
+        return next(splitter.split(np.zeros(len(y)), y))
+    
+    cache_path = data_path + '.split.npz'
+    stat = os.stat(data_path)
+    digest = hashlib.blake2b(y.tobytes(), digest_size=16)
+    digest.update(np.array([len(y), stat.st_size, stat.st_mtime_ns], dtype=np.int64).tobytes())
+    key = np.frombuffer(digest.digest(), dtype=np.uint8)
+    
+    try:
+        with np.load(cache_path) as cached:
+            if np.array_equal(cached['key'], key):
+                return cached['train_idx'], cached['test_idx']
+    except (OSError, KeyError, ValueError):
+        pass
+    
+    train_idx, test_idx = next(splitter.split(np.zeros(len(y)), y))
+    try:
+        np.savez(cache_path, key=key, train_idx=train_idx, test_idx=test_idx)
+    except OSError as e:
+        logger.warning(f"Could not cache the train/test split in {cache_path}: {e}")
+    return train_idx, test_idx
+
+def load_training_data(data_path: str = None) -> pd.DataFrame:
+    """Training samples as a DataFrame with 'text' and 'is_phishing' columns
+    
+    Reads a Parquet (.parquet) or CSV file when data_path is given, otherwise
+    uses the built-in TRAINING_DATA.
+    """
+    if data_path is None:
+        return pd.DataFrame(TRAINING_DATA)
+    columns = ['text', 'is_phishing']
+    if data_path.endswith('.parquet'):
+        df = pd.read_parquet(data_path, columns=columns)
+    else:
+        df = pd.read_csv(data_path, usecols=columns)
+    
+    # Drop rows the vectorizer or the int8 label cast cannot take: missing
+    # cells, blank text and labels other than 0/1
+    total = len(df)
+    df = df.dropna(subset=columns)
+    text = df['text'].astype(str)
+    labels = pd.to_numeric(df['is_phishing'], errors='coerce')
+    df = df.assign(text=text, is_phishing=labels)[text.str.strip().ne('') & labels.isin([0, 1])]
+    if len(df) < total:
+        logger.warning(f"Dropped {total - len(df)} of {total} rows from {data_path} "
+                       f"with missing text or a label other than 0/1")
+    if df.empty:
+        raise ValueError(f"No valid training rows in {data_path}")
+    return df
+
+def train_model(data_path: str = None, n_jobs: int = None):
+    """Train the advanced phishing detection model (n_jobs: XGBoost threads, default one per CPU)"""
     
     print("\n" + "="*70)
     print(" PhishGuard - Advanced ML Model Training")
@@ -101,84 +172,43 @@ def train_model():
     # Create detector with optional XGBoost
     print("📦 Initializing model...")
     detector = PhishingDetector()
-    detector.create_model()
+    detector.create_model(n_jobs=n_jobs)
     
     print(f"✓ Using {'XGBoost' if detector.use_xgboost else 'GradientBoosting'} classifier")
-    print(f"✓ TF-IDF vectorizer: max 1000 features, bigrams enabled")
+    if detector.use_xgboost:
+        print(f"✓ Using XGBoost hist, nthread={detector.model.n_jobs}")
+    print(f"✓ TF-IDF vectorizer: 1024 hashed features, bigrams enabled")
     
     # Extract features
     feature_extractor = FeatureExtractor()
     
-    X_text = []
-    X_features = []
-    y = []
-    
-    print(f"\n📊 Processing {len(TRAINING_DATA)} training samples...")
-    
-    for i, sample in enumerate(TRAINING_DATA):
-        try:
-            text = sample['text']
-            label = sample['is_phishing']
-            
-            # Extract comprehensive features
-            features = {
-                'subject_length': len(text.split()[0]) if text.split() else 0,
-                'body_length': len(text),
-                'url_count': text.count('http') + text.count('http://'),
-                'urgent_words': sum(1 for w in ['urgent', 'immediate', 'confirm', 'verify', 'click', 'action', 'limited', 'expire'] if w in text.lower()),
-                'financial_words': sum(1 for w in ['payment', 'account', 'credit', 'verify', 'bank', 'billing', 'transaction'] if w in text.lower()),
-                'personal_words': sum(1 for w in ['password', 'identity', 'ssn', 'security number'] if w in text.lower()),
-                'action_words': sum(1 for w in ['click', 'download', 'update', 'reset', 'confirm', 'verify'] if w in text.lower()),
-                'urgency_score': min(text.count('!') / 10, 1.0),
-            }
-            
-            # Build feature vector matching detector expectations
-            feature_vector = [
-                features['subject_length'],
-                features['body_length'],
-                features['url_count'],
-                features['urgent_words'],
-                features['financial_words'],
-                features['personal_words'],
-                features['action_words'],
-                features['urgency_score'],
-                0,  # url_risk_score placeholder
-                0,  # suspicious_urls placeholder
-                0,  # sender_domain_mismatch placeholder
-                int('admin' in text.lower() or 'support' in text.lower()),
-                0,  # excessive_links placeholder
-                int(len(text) < 50),
-                int(text.count('!') > 2),
-                0,  # unusual_capitals placeholder
-            ]
-            
-            X_text.append(text)
-            X_features.append(feature_vector)
-            y.append(label)
-            
-            status = "🚨 PHISHING" if label == 1 else "✅ LEGITIMATE"
-            print(f"  [{i+1:2d}/{len(TRAINING_DATA)}] {status}: {text[:50]}...")
-            
-        except Exception as e:
-            logger.error(f"Error processing sample {i}: {e}")
-            continue
-    
-    # Prepare data
-    X_features = np.array(X_features)
-    y = np.array(y)
+    df = load_training_data(data_path)
+    # Object array of the texts, so the split below indexes it directly
+    X_text = df['text'].to_numpy(dtype=object)
+    # 0/1 labels fit in one byte per sample
+    y = df['is_phishing'].to_numpy(dtype=np.int8)
+    
+    print(f"\n📊 Processing {len(df)} training samples...")
+    
+    # Extract comprehensive features for every sample at once
+    X_features = build_feature_matrix_parallel(X_text)
+    
+    # One write for the whole listing rather than a print per sample
+    print("\n".join(
+        f"  [{i+1:2d}/{len(df)}] {'🚨 PHISHING' if label == 1 else '✅ LEGITIMATE'}: {text[:50]}..."
+        for i, (text, label) in enumerate(zip(X_text, y))
+    ))
     
     print(f"\n✓ Processed {len(X_text)} samples")
-    print(f"  - Phishing: {sum(y)} samples")
-    print(f"  - Legitimate: {len(y) - sum(y)} samples")
+    print(f"  - Phishing: {y.sum()} samples")
+    print(f"  - Legitimate: {len(y) - y.sum()} samples")
     
     # Split data
     print("\n🔀 Splitting data (80% train, 20% test)...")
-    X_text_train, X_text_test, X_feat_train, X_feat_test, y_train, y_test = train_test_split(
-        X_text, X_features, y,
-        test_size=0.2,
-        random_state=42,
-        stratify=y
-    )
+    train_idx, test_idx = load_split(y, data_path)
+    X_text_train, X_text_test = X_text[train_idx], X_text[test_idx]
+    X_feat_train, X_feat_test = X_features[train_idx], X_features[test_idx]
+    y_train, y_test = y[train_idx], y[test_idx]
     
     # Train model
     print(f"\n⏳ Training model...")
@@ -192,7 +222,11 @@ def train_model():
     
     # Evaluate
     print("\n📈 Evaluating model performance...")
-    eval_results = detector.evaluate(X_text_test, X_feat_test, y_test)
+    # Vectorize the test split and the test cases together, once; both are reused below
+    test_texts = [test_text for test_text, _ in TEST_CASES]
+    X_vectorized = detector.vectorizer.transform(np.concatenate([X_text_test, test_texts]))
+    X_text_test_vectorized, test_vectorized = X_vectorized[:len(X_text_test)], X_vectorized[len(X_text_test):]
+    eval_results = detector.evaluate_cached(X_text_test_vectorized, X_feat_test, y_test)
     
     if eval_results:
         print("\n" + "-"*50)
@@ -230,31 +264,19 @@ def train_model():
     print(" Testing Predictions on New Data")
     print("="*70)
     
-    test_cases = [
-        ("URGENT: Verify your account immediately or it will be suspended. Click here now!", 1),
-        ("Hi, just wanted to schedule a meeting for next week. Does Thursday work?", 0),
-        ("Your PayPal account requires immediate action. Confirm your password now.", 1),
-        ("Project update: Q3 results are ready for review in the system.", 0),
-        ("CRITICAL: Unusual activity detected. Verify identity immediately via link.", 1),
-    ]
-    
-    for test_text, expected in test_cases:
-        features_counts = {
-            'urgent': sum(1 for w in ['urgent', 'immediate'] if w in test_text.lower()),
-            'action': sum(1 for w in ['click', 'confirm', 'verify'] if w in test_text.lower()),
-        }
-        
-        feature_vector = np.array([
-            0, len(test_text), test_text.count('http'),
-            features_counts['urgent'],
-            sum(1 for w in ['paypal', 'account'] if w in test_text.lower()),
-            sum(1 for w in ['password'] if w in test_text.lower()),
-            features_counts['action'],
-            min(test_text.count('!') / 10, 1.0),
-            0, 0, 0, 0, 0, 0, 0, 0
-        ])
-        
-        prediction, confidence = detector.predict(test_text, feature_vector)
+    # A handful of rows: one thread avoids spinning up the OpenMP pool
+    if detector.use_xgboost:
+        detector.model.set_params(n_jobs=1)
+    
+    # Built the same way as the training features
+    test_features = np.zeros((len(TEST_CASES), 16), dtype=np.float32)
+    for i, test_text in enumerate(test_texts):
+        test_features[i] = build_features(test_text)
+    
+    # Predict all test cases in one call
+    predictions, confidences = detector.predict_vectorized(test_vectorized, test_features)
+    
+    for (test_text, expected), prediction, confidence in zip(TEST_CASES, predictions, confidences):
         is_phishing = prediction == 1
         
         expected_str = "PHISHING" if expected == 1 else "LEGITIMATE"
@@ -276,8 +298,13 @@ def train_model():
     return True
 
 if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Train the advanced phishing detection model')
+    parser.add_argument('--data', help='Parquet or CSV file with text and is_phishing columns '
+                                       '(default: built-in training data)')
+    args = parser.parse_args()
+    
     try:
-        success = train_model()
+        success = train_model(data_path=args.data)
         sys.exit(0 if success else 1)
     except Exception as e:
         print(f"\n❌ Error: {e}")
@@ -1,3 +1,5 @@
+import argparse
+import logging
 import numpy as np
 import pandas as pd
 from sklearn.model_selection import train_test_split
@@ -9,6 +11,9 @@ sys.path.insert(0, os.path.dirname(__file__))
 
 from src.models.detector import PhishingDetector
 from src.utils.feature_extractor import FeatureExtractor
+from src.utils.quick_features import build_feature_matrix_parallel, build_features
+
+logger = logging.getLogger(__name__)
 
 # Sample training data
 # In production, use real phishing/legitimate email datasets
@@ -55,8 +60,44 @@ TRAINING_DATA = [
     },
 ]
 
-def train_model():
-    """Train the phishing detection model"""
+# Unseen texts scored after training
+TEST_CASES = [
+    "URGENT: Verify your account immediately or it will be suspended. Click here now!",
+    "Hi, just wanted to schedule a meeting for next week. Does Thursday work?",
+    "Your PayPal account requires immediate action. Confirm your password now.",
+    "Project update: Q3 results are ready for review in the system.",
+]
+
+def load_training_data(data_path: str = None) -> pd.DataFrame:
+    """Training samples as a DataFrame with 'text' and 'is_phishing' columns
+    
+    Reads a Parquet (.parquet) or CSV file when data_path is given, otherwise
+    uses the built-in TRAINING_DATA.
+    """
+    if data_path is None:
+        return pd.DataFrame(TRAINING_DATA)
+    columns = ['text', 'is_phishing']
+    if data_path.endswith('.parquet'):
+        df = pd.read_parquet(data_path, columns=columns)
+    else:
+        df = pd.read_csv(data_path, usecols=columns)
+    
+    # Drop rows the vectorizer or the int8 label cast cannot take: missing
+    # cells, blank text and labels other than 0/1
+    total = len(df)
+    df = df.dropna(subset=columns)
+    text = df['text'].astype(str)
+    labels = pd.to_numeric(df['is_phishing'], errors='coerce')
+    df = df.assign(text=text, is_phishing=labels)[text.str.strip().ne('') & labels.isin([0, 1])]
+    if len(df) < total:
+        logger.warning(f"Dropped {total - len(df)} of {total} rows from {data_path} "
+                       f"with missing text or a label other than 0/1")
+    if df.empty:
+        raise ValueError(f"No valid training rows in {data_path}")
+    return df
+
+def train_model(data_path: str = None, n_jobs: int = None):
+    """Train the phishing detection model (n_jobs: XGBoost threads, default one per CPU)"""
     
     print("=" * 60)
     print("Phishing Detection Model Training")
@@ -64,71 +105,32 @@ def train_model():
     
     # Create detector
     detector = PhishingDetector()
-    detector.create_model()
+    detector.create_model(n_jobs=n_jobs)
+    if detector.use_xgboost:
+        print(f"✓ Using XGBoost hist, nthread={detector.model.n_jobs}")
     
     # Extract features
     feature_extractor = FeatureExtractor()
     
-    X_text = []
-    X_features = []
-    y = []
-    
-    print(f"\nProcessing {len(TRAINING_DATA)} training samples...")
-    
-    for i, sample in enumerate(TRAINING_DATA):
-        try:
-            text = sample['text']
-            label = sample['is_phishing']
-            
-            # Extract basic features
-            features = {
-                'subject_length': len(text.split()[0]) if text.split() else 0,
-                'body_length': len(text),
-                'url_count': text.count('http'),
-                'urgent_words': sum(1 for w in ['urgent', 'immediate', 'confirm', 'verify', 'click'] if w in text.lower()),
-                'financial_words': sum(1 for w in ['payment', 'account', 'credit', 'verify'] if w in text.lower()),
-                'personal_words': sum(1 for w in ['password', 'identity'] if w in text.lower()),
-                'action_words': sum(1 for w in ['click', 'download', 'update'] if w in text.lower()),
-                'urgency_score': min(text.count('!') / 10, 1.0),
-            }
-            
-            feature_vector = [
-                features['subject_length'],
-                features['body_length'],
-                features['url_count'],
-                features['urgent_words'],
-                features['financial_words'],
-                features['personal_words'],
-                features['action_words'],
-                features['urgency_score'],
-                0,  # url_risk_score
-                0,  # suspicious_urls
-                0,  # sender_domain_mismatch
-                int('admin' in text.lower() or 'support' in text.lower()),
-                0,  # excessive_links
-                int(len(text) < 50),
-                int(text.count('!') > 2),
-                0,  # unusual_capitals
-            ]
-            
-            X_text.append(text)
-            X_features.append(feature_vector)
-            y.append(label)
-            
-            status = "PHISHING" if label == 1 else "LEGITIMATE"
-            print(f"  [{i+1}/{len(TRAINING_DATA)}] {status}: {text[:50]}...")
-            
-        except Exception as e:
-            print(f"  ERROR processing sample {i}: {e}")
-            continue
-    
-    # Convert to numpy arrays
-    X_features = np.array(X_features)
-    y = np.array(y)
+    df = load_training_data(data_path)
+    # Object array of the texts, handed to the vectorizer without another conversion
+    X_text = df['text'].to_numpy(dtype=object)
+    # 0/1 labels fit in one byte per sample
+    y = df['is_phishing'].to_numpy(dtype=np.int8)
+    
+    print(f"\nProcessing {len(df)} training samples...")
+    
+    X_features = build_feature_matrix_parallel(X_text)
+    
+    # One write for the whole listing rather than a print per sample
+    print("\n".join(
+        f"  [{i+1}/{len(df)}] {'PHISHING' if label == 1 else 'LEGITIMATE'}: {text[:50]}..."
+        for i, (text, label) in enumerate(zip(X_text, y))
+    ))
     
     print(f"\n✓ Processed {len(X_text)} samples")
-    print(f"  Phishing samples: {sum(y)}")
-    print(f"  Legitimate samples: {len(y) - sum(y)}")
+    print(f"  Phishing samples: {y.sum()}")
+    print(f"  Legitimate samples: {len(y) - y.sum()}")
     
     # Train model
     print("\nTraining model...")
@@ -138,7 +140,10 @@ def train_model():
     
     # Evaluate
     print("\nEvaluating model...")
-    eval_results = detector.evaluate(X_text, X_features, y)
+    # Vectorize the samples and the test cases together, once; both are reused below
+    X_vectorized = detector.vectorizer.transform(np.concatenate([X_text, TEST_CASES]))
+    X_text_vectorized, test_vectorized = X_vectorized[:len(X_text)], X_vectorized[len(X_text):]
+    eval_results = detector.evaluate_cached(X_text_vectorized, X_features, y)
     
     if eval_results:
         print(f"  Precision: {eval_results.get('precision', 0):.3f}")
@@ -163,36 +168,15 @@ def train_model():
     print("Testing Predictions")
     print("=" * 60)
     
-    test_cases = [
-        "URGENT: Verify your account immediately or it will be suspended. Click here now!",
-        "Hi, just wanted to schedule a meeting for next week. Does Thursday work?",
-        "Your PayPal account requires immediate action. Confirm your password now.",
-        "Project update: Q3 results are ready for review in the system.",
-    ]
-    
-    for test_text in test_cases:
-        features_dict = {
-            'subject_length': 0,
-            'body_length': len(test_text),
-            'url_count': test_text.count('http'),
-            'urgent_words': sum(1 for w in ['urgent', 'immediate', 'confirm', 'verify'] if w in test_text.lower()),
-            'financial_words': sum(1 for w in ['payment', 'account'] if w in test_text.lower()),
-            'personal_words': sum(1 for w in ['password'] if w in test_text.lower()),
-            'action_words': sum(1 for w in ['click', 'confirm'] if w in test_text.lower()),
-            'urgency_score': min(test_text.count('!') / 10, 1.0),
-        }
-        
-        feature_vector = np.array([
-            0, len(test_text), 0,
-            features_dict['urgent_words'],
-            features_dict['financial_words'],
-            features_dict['personal_words'],
-            features_dict['action_words'],
-            features_dict['urgency_score'],
-            0, 0, 0, 0, 0, 0, 0, 0
-        ])
-        
-        prediction, confidence = detector.predict(test_text, feature_vector)
+    # Built the same way as the training features
+    test_features = np.zeros((len(TEST_CASES), 16), dtype=np.float32)
+    for i, test_text in enumerate(TEST_CASES):
+        test_features[i] = build_features(test_text)
+    
+    # Predict all test cases in one call
+    predictions, confidences = detector.predict_vectorized(test_vectorized, test_features)
+    
+    for test_text, prediction, confidence in zip(TEST_CASES, predictions, confidences):
         result = "PHISHING" if prediction == 1 else "LEGITIMATE"
         
         print(f"\nText: {test_text}")
@@ -203,4 +187,8 @@ def train_model():
     print("=" * 60)
 
 if __name__ == '__main__':
-    train_model()
+    parser = argparse.ArgumentParser(description='Train the phishing detection model')
+    parser.add_argument('--data', help='Parquet or CSV file with text and is_phishing columns '
+                                       '(default: built-in sample data)')
+    args = parser.parse_args()
+    train_model(data_path=args.data)